@@ -0,0 +1,196 @@
+"""
+Агрегаты прогресса на стороне БД: счётчики минут и количества
+у целей и подзадач и подневные итоги пользователя (daily_rollup),
+которые обновляются при каждой записи лога
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, distinct, func, select, update
+from sqlalchemy.orm import Session
+
+from database import dialect_insert
+from models import Goal, Log, Subgoal, DailyRollup, User
+
+Totals = Tuple[int, int]
+
+
+def fetch_goals_with_totals(db: Session, user_id: str) -> list:
+    """
+    Все цели пользователя вместе с накопленными суммами одним запросом.
+
+    Строки содержат поля id, type, target, period_start, period_end,
+    total_minutes, total_count — этого достаточно для пакетного расчёта метрик.
+    """
+    return db.query(
+        Goal.id,
+        Goal.type,
+        Goal.target,
+        Goal.period_start,
+        Goal.period_end,
+        Goal.total_minutes,
+        Goal.total_count
+    ).filter(Goal.user_id == user_id).all()
+
+
+def apply_progress_deltas(
+    db: Session,
+    goal_deltas: Dict[str, Totals],
+    subgoal_deltas: Optional[Dict[str, Totals]] = None
+) -> None:
+    """
+    Прибавляет {id: (минуты, количество)} к счётчикам целей и подзадач.
+    Обновление атомарное (SET total = total + delta) и идёт в текущей транзакции.
+    """
+    for model, deltas in ((Goal, goal_deltas), (Subgoal, subgoal_deltas or {})):
+        params = [
+            {"b_id": entity_id, "b_minutes": minutes, "b_count": count}
+            for entity_id, (minutes, count) in deltas.items()
+            if minutes or count
+        ]
+        if not params:
+            continue
+
+        table = model.__table__
+        db.execute(
+            update(table).where(table.c.id == bindparam("b_id")).values(
+                total_minutes=table.c.total_minutes + bindparam("b_minutes"),
+                total_count=table.c.total_count + bindparam("b_count")
+            ),
+            params
+        )
+
+
+def apply_log_delta(
+    db: Session, goal_id: str, subgoal_id: Optional[str], minutes: int, count: int
+) -> None:
+    """Изменение одного лога: дельта идёт в цель и, если указана, в подзадачу."""
+    apply_progress_deltas(
+        db,
+        {goal_id: (minutes, count)},
+        {subgoal_id: (minutes, count)} if subgoal_id else None
+    )
+
+
+def collect_log_deltas(rows: Iterable[dict]) -> Tuple[Dict[str, Totals], Dict[str, Totals]]:
+    """Суммирует дельты пачки логов по целям и подзадачам."""
+    goal_deltas = defaultdict(lambda: (0, 0))
+    subgoal_deltas = defaultdict(lambda: (0, 0))
+
+    for row in rows:
+        minutes, count = row["minutes_spent"], row["count_done"]
+        goal_minutes, goal_count = goal_deltas[row["goal_id"]]
+        goal_deltas[row["goal_id"]] = (goal_minutes + minutes, goal_count + count)
+        if row["subgoal_id"]:
+            sub_minutes, sub_count = subgoal_deltas[row["subgoal_id"]]
+            subgoal_deltas[row["subgoal_id"]] = (sub_minutes + minutes, sub_count + count)
+
+    return dict(goal_deltas), dict(subgoal_deltas)
+
+
+def rebuild_progress_totals(db: Session, goal_ids: Optional[Iterable[str]] = None) -> None:
+    """
+    Пересчитывает счётчики целей и их подзадач заново из логов.
+    Без goal_ids пересчитываются все цели. Коммит остаётся за вызывающим.
+    """
+    for model, log_key in ((Goal, Log.goal_id), (Subgoal, Log.subgoal_id)):
+        minutes = select(func.coalesce(func.sum(Log.minutes_spent), 0)).where(
+            log_key == model.id
+        ).scalar_subquery()
+        count = select(func.coalesce(func.sum(Log.count_done), 0)).where(
+            log_key == model.id
+        ).scalar_subquery()
+
+        stmt = update(model).values(total_minutes=minutes, total_count=count)
+        if goal_ids is not None:
+            goal_column = Goal.id if model is Goal else Subgoal.goal_id
+            stmt = stmt.where(goal_column.in_(list(goal_ids)))
+
+        db.execute(stmt.execution_options(synchronize_session=False))
+
+
+def _daily_totals_select(user_ids: Iterable[str], days: Optional[Iterable[date]] = None):
+    """SELECT подневных итогов из логов: одна строка на (пользователь, день)."""
+    stmt = select(
+        Goal.user_id,
+        Log.log_date,
+        func.coalesce(func.sum(Log.minutes_spent), 0),
+        func.coalesce(func.sum(Log.count_done), 0),
+        func.count(distinct(Log.goal_id))
+    ).join(Goal, Log.goal_id == Goal.id).where(Goal.user_id.in_(list(user_ids)))
+
+    if days is not None:
+        stmt = stmt.where(Log.log_date.in_(list(days)))
+
+    return stmt.group_by(Goal.user_id, Log.log_date)
+
+
+def _rollup_lock_stmt(user_id: str):
+    """
+    SELECT ... FOR NO KEY UPDATE строки пользователя. NO KEY не конфликтует
+    с блокировками внешних ключей, поэтому вставка целей и логов не ждёт.
+    """
+    return select(User.id).where(User.id == user_id).with_for_update(key_share=True)
+
+
+def refresh_daily_rollup(db: Session, user_id: str, days: Iterable[date]) -> None:
+    """
+    Пересчитывает строки daily_rollup пользователя за указанные дни
+    из логов этих дней. Вызывается после записи логов в той же транзакции.
+
+    На PostgreSQL (READ COMMITTED) пересчёты одного пользователя идут по очереди:
+    иначе две транзакции, записавшие логи в один день, видели бы только свой
+    незакоммиченный лог, и закоммитившая последней затёрла бы чужие минуты.
+    Вторая транзакция ждёт блокировку, и следующий запрос видит закоммиченное первой.
+    SQLite пускает одного писателя за раз, там блокировка не нужна.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        db.execute(_rollup_lock_stmt(user_id))
+
+    days = sorted(set(days))
+    columns = ["user_id", "day", "minutes", "count", "goals_active"]
+
+    for i in range(0, len(days), 500):
+        chunk = days[i:i + 500]
+
+        stmt = dialect_insert(db)(DailyRollup).from_select(
+            columns, _daily_totals_select([user_id], chunk)
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "day"],
+            set_={
+                "minutes": stmt.excluded["minutes"],
+                "count": stmt.excluded["count"],
+                "goals_active": stmt.excluded["goals_active"]
+            }
+        ))
+
+        # Дни, в которых логов не осталось, из сводки убираем
+        logged_days = select(Log.log_date).join(Goal, Log.goal_id == Goal.id).where(
+            Goal.user_id == user_id, Log.log_date.in_(chunk)
+        )
+        db.execute(delete(DailyRollup).where(
+            DailyRollup.user_id == user_id,
+            DailyRollup.day.in_(chunk),
+            DailyRollup.day.not_in(logged_days)
+        ))
+
+
+def rebuild_daily_rollup(db: Session, user_ids: Optional[Iterable[str]] = None) -> None:
+    """
+    Заново строит daily_rollup из логов (для всех пользователей или указанных).
+    Коммит остаётся за вызывающим.
+    """
+    if user_ids is None:
+        user_ids = [user_id for (user_id,) in db.query(Goal.user_id).distinct()]
+        db.execute(delete(DailyRollup))
+    else:
+        user_ids = list(user_ids)
+        db.execute(delete(DailyRollup).where(DailyRollup.user_id.in_(user_ids)))
+
+    columns = ["user_id", "day", "minutes", "count", "goals_active"]
+    for i in range(0, len(user_ids), 500):
+        db.execute(DailyRollup.__table__.insert().from_select(
+            columns, _daily_totals_select(user_ids[i:i + 500])
+        ))
@@ -0,0 +1,71 @@
+"""make users email unique
+
+Revision ID: 4d4609eb7eaf
+Revises: cb1660b368e8
+Create Date: 2026-10-18 15:08:41.502117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d4609eb7eaf'
+down_revision: Union[str, None] = 'cb1660b368e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _merge_duplicate_users() -> None:
+    """
+    Сливает пользователей с одинаковым email (могли появиться при гонке входов):
+    цели переносятся на самого раннего, подневная сводка пересчитывается.
+    """
+    conn = op.get_bind()
+    emails = conn.execute(sa.text(
+        "SELECT email FROM users WHERE email IS NOT NULL "
+        "GROUP BY email HAVING COUNT(*) > 1"
+    )).scalars().all()
+
+    for email in emails:
+        user_ids = conn.execute(sa.text(
+            "SELECT id FROM users WHERE email = :email ORDER BY created_at, id"
+        ), {"email": email}).scalars().all()
+        keep, rest = user_ids[0], user_ids[1:]
+
+        params = {"keep": keep, "rest": rest}
+        conn.execute(
+            sa.text("UPDATE goals SET user_id = :keep WHERE user_id IN :rest")
+            .bindparams(sa.bindparam("rest", expanding=True)),
+            params
+        )
+        conn.execute(
+            sa.text("DELETE FROM daily_rollup WHERE user_id = :keep OR user_id IN :rest")
+            .bindparams(sa.bindparam("rest", expanding=True)),
+            params
+        )
+        conn.execute(sa.text(
+            "INSERT INTO daily_rollup (user_id, day, minutes, count, goals_active) "
+            "SELECT g.user_id, l.log_date, COALESCE(SUM(l.minutes_spent), 0), "
+            "COALESCE(SUM(l.count_done), 0), COUNT(DISTINCT l.goal_id) "
+            "FROM logs l JOIN goals g ON l.goal_id = g.id "
+            "WHERE g.user_id = :keep GROUP BY g.user_id, l.log_date"
+        ), {"keep": keep})
+        conn.execute(
+            sa.text("DELETE FROM users WHERE id IN :rest")
+            .bindparams(sa.bindparam("rest", expanding=True)),
+            {"rest": rest}
+        )
+
+
+def upgrade() -> None:
+    _merge_duplicate_users()
+    op.drop_index('ix_users_email', table_name='users')
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_email', table_name='users')
+    op.create_index('ix_users_email', 'users', ['email'])
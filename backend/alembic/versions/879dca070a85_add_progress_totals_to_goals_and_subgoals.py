@@ -0,0 +1,38 @@
+"""add progress totals to goals and subgoals
+
+Revision ID: 879dca070a85
+Revises: d49c8f3fbc48
+Create Date: 2026-10-18 12:15:47.902361
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '879dca070a85'
+down_revision: Union[str, None] = 'd49c8f3fbc48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table, log_key in (('goals', 'goal_id'), ('subgoals', 'subgoal_id')):
+        op.add_column(table, sa.Column('total_minutes', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('total_count', sa.Integer(), nullable=False, server_default='0'))
+
+        # Заполняем счётчики из уже накопленных логов
+        op.execute(
+            f"UPDATE {table} SET "
+            f"total_minutes = (SELECT COALESCE(SUM(minutes_spent), 0) FROM logs WHERE logs.{log_key} = {table}.id), "
+            f"total_count = (SELECT COALESCE(SUM(count_done), 0) FROM logs WHERE logs.{log_key} = {table}.id)"
+        )
+
+
+def downgrade() -> None:
+    for table in ('subgoals', 'goals'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('total_count')
+            batch_op.drop_column('total_minutes')
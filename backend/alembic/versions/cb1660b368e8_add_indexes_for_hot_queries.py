@@ -0,0 +1,37 @@
+"""add indexes for hot queries
+
+Revision ID: cb1660b368e8
+Revises: fe9f12db6578
+Create Date: 2026-10-18 14:22:09.173540
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cb1660b368e8'
+down_revision: Union[str, None] = 'fe9f12db6578'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_email', 'users', ['email'])
+    op.create_index('ix_goals_user_id_priority_created_at', 'goals', ['user_id', 'priority', 'created_at'])
+    op.create_index('ix_goals_user_id_period_end', 'goals', ['user_id', 'period_end'])
+    op.create_index('ix_subgoals_goal_id_position', 'subgoals', ['goal_id', 'position'])
+    op.create_index('ix_logs_subgoal_id', 'logs', ['subgoal_id'])
+    op.create_index('ix_logs_goal_id_log_date_id', 'logs', ['goal_id', 'log_date', 'id'])
+    op.create_index('ix_logs_log_date_id', 'logs', ['log_date', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_logs_log_date_id', table_name='logs')
+    op.drop_index('ix_logs_goal_id_log_date_id', table_name='logs')
+    op.drop_index('ix_logs_subgoal_id', table_name='logs')
+    op.drop_index('ix_subgoals_goal_id_position', table_name='subgoals')
+    op.drop_index('ix_goals_user_id_period_end', table_name='goals')
+    op.drop_index('ix_goals_user_id_priority_created_at', table_name='goals')
+    op.drop_index('ix_users_email', table_name='users')
@@ -0,0 +1,64 @@
+"""add unique index for logs without subgoal
+
+Revision ID: d49c8f3fbc48
+Revises: 887c652cb6b1
+Create Date: 2026-10-18 11:02:14.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd49c8f3fbc48'
+down_revision: Union[str, None] = '887c652cb6b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _merge_duplicate_logs() -> None:
+    """Сливает дубли логов без подзадачи (могли появиться при гонке запросов)."""
+    conn = op.get_bind()
+    duplicates = conn.execute(sa.text(
+        "SELECT goal_id, log_date FROM logs WHERE subgoal_id IS NULL "
+        "GROUP BY goal_id, log_date HAVING COUNT(*) > 1"
+    )).fetchall()
+
+    for goal_id, log_date in duplicates:
+        rows = conn.execute(sa.text(
+            "SELECT id, minutes_spent, count_done, note FROM logs "
+            "WHERE goal_id = :goal_id AND log_date = :log_date AND subgoal_id IS NULL "
+            "ORDER BY created_at, id"
+        ), {"goal_id": goal_id, "log_date": log_date}).fetchall()
+
+        keep, rest = rows[0], rows[1:]
+        notes = [row.note for row in rows if row.note]
+        conn.execute(sa.text(
+            "UPDATE logs SET minutes_spent = :minutes, count_done = :count, note = :note "
+            "WHERE id = :id"
+        ), {
+            "id": keep.id,
+            "minutes": sum(row.minutes_spent or 0 for row in rows),
+            "count": sum(row.count_done or 0 for row in rows),
+            "note": " | ".join(notes) if notes else None
+        })
+        conn.execute(
+            sa.text("DELETE FROM logs WHERE id IN :ids").bindparams(sa.bindparam("ids", expanding=True)),
+            {"ids": [row.id for row in rest]}
+        )
+
+
+def upgrade() -> None:
+    _merge_duplicate_logs()
+    op.create_index(
+        'uq_goal_log_date_no_subgoal', 'logs', ['goal_id', 'log_date'],
+        unique=True,
+        sqlite_where=sa.text('subgoal_id IS NULL'),
+        postgresql_where=sa.text('subgoal_id IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_goal_log_date_no_subgoal', table_name='logs')
@@ -0,0 +1,53 @@
+"""add daily_rollup table
+
+Revision ID: fe9f12db6578
+Revises: 879dca070a85
+Create Date: 2026-10-18 13:40:21.556019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fe9f12db6578'
+down_revision: Union[str, None] = '879dca070a85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_CHUNK = 500
+
+
+def upgrade() -> None:
+    op.create_table('daily_rollup',
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('minutes', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('goals_active', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+
+    # Заполняем сводку из существующих логов порциями по пользователям,
+    # чтобы не держать один огромный INSERT ... SELECT по всей таблице
+    conn = op.get_bind()
+    user_ids = [row[0] for row in conn.execute(sa.text("SELECT id FROM users ORDER BY id"))]
+    backfill = sa.text(
+        "INSERT INTO daily_rollup (user_id, day, minutes, count, goals_active) "
+        "SELECT goals.user_id, logs.log_date, "
+        "COALESCE(SUM(logs.minutes_spent), 0), COALESCE(SUM(logs.count_done), 0), "
+        "COUNT(DISTINCT logs.goal_id) "
+        "FROM logs JOIN goals ON logs.goal_id = goals.id "
+        "WHERE goals.user_id IN :user_ids "
+        "GROUP BY goals.user_id, logs.log_date"
+    ).bindparams(sa.bindparam("user_ids", expanding=True))
+
+    for i in range(0, len(user_ids), BACKFILL_CHUNK):
+        conn.execute(backfill, {"user_ids": user_ids[i:i + BACKFILL_CHUNK]})
+
+
+def downgrade() -> None:
+    op.drop_table('daily_rollup')
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк накладных расходов учёта запросов и метрик (QueryStatsMiddleware
+и MetricsMiddleware) на пустом ASGI-приложении.
+
+Запуск из backend/:
+    python -m pytest benchmarks/bench_middleware.py --benchmark-json=bench.json
+    python benchmarks/compare.py bench.json
+"""
+import asyncio
+import time
+
+from instrumentation import MetricsMiddleware, QueryStatsMiddleware
+
+REQUESTS = 1000
+
+# Порог для явного прогона; в основной набор тестов проверка не входит, так как зависит от загрузки машины
+MAX_OVERHEAD_US = 200
+
+
+async def _bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _receive():
+    return {"type": "http.request"}
+
+
+async def _send(message):
+    pass
+
+
+async def _serve(app, n: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        await app({"type": "http", "method": "GET", "path": "/bench"}, _receive, _send)
+    return time.perf_counter() - started
+
+
+def test_middleware_overhead(benchmark):
+    """Время REQUESTS запросов через middleware; накладные расходы на запрос — в extra_info."""
+    wrapped = QueryStatsMiddleware(MetricsMiddleware(_bare_app))
+    bare = min(asyncio.run(_serve(_bare_app, REQUESTS)) for _ in range(5))
+
+    benchmark.pedantic(lambda: asyncio.run(_serve(wrapped, REQUESTS)), rounds=10, warmup_rounds=1)
+    overhead_us = (benchmark.stats.stats.median - bare) / REQUESTS * 1e6
+    benchmark.extra_info["overhead_us"] = round(overhead_us, 1)
+
+    print(f"  {overhead_us:.1f} мкс на запрос")
+    assert overhead_us < MAX_OVERHEAD_US
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки расчётов прогресса (pytest-benchmark) на синтетических целях
+с 10^3–10^6 логов: время и пиковая память (tracemalloc) на вызов.
+
+Запуск из backend/:
+    python -m pytest benchmarks/bench_progress.py --benchmark-json=bench.json
+    python benchmarks/compare.py bench.json
+
+BENCH_MAX_LOGS ограничивает самый большой размер (например, 100000 для быстрого прогона).
+"""
+import os
+import random
+import tracemalloc
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import List, NamedTuple
+
+import pytest
+
+from models.models import Goal, GoalType, GoalUnit
+from progress import calculate_progress_metrics, calculate_weekly_summary, get_daily_progress_series
+
+SIZES = [n for n in (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6) if n <= int(os.environ.get("BENCH_MAX_LOGS", 10 ** 6))]
+
+# Раундов меньше для больших размеров, чтобы прогон 10^6 занимал секунды, а не минуты
+ROUNDS = {10 ** 3: 50, 10 ** 4: 20, 10 ** 5: 5, 10 ** 6: 3}
+
+PERIOD_START = date(2026, 1, 1)
+PERIOD_DAYS = 365
+
+
+class LogRow(NamedTuple):
+    """Лог с полями, которые читают функции прогресса (ORM-объекты на 10^6 строк слишком тяжёлые)."""
+    log_date: date
+    minutes_spent: int
+    count_done: int
+
+
+def make_goal() -> Goal:
+    return Goal(
+        id="bench-goal",
+        user_id="bench-user",
+        title="Бенчмарк",
+        type=GoalType.TIME,
+        target=500.0,
+        unit=GoalUnit.HOURS,
+        period_start=PERIOD_START,
+        period_end=PERIOD_START + timedelta(days=PERIOD_DAYS - 1)
+    )
+
+
+@lru_cache(maxsize=None)
+def make_logs(n: int) -> List[LogRow]:
+    """n логов, случайно распределённых по дням периода (детерминированно)."""
+    rng = random.Random(n)
+    days = [PERIOD_START + timedelta(days=i) for i in range(PERIOD_DAYS)]
+    return [
+        LogRow(rng.choice(days), rng.randint(5, 120), rng.randint(0, 3))
+        for _ in range(n)
+    ]
+
+
+def _run(benchmark, fn, *args):
+    """Замер времени через pytest-benchmark и отдельный вызов под tracemalloc для пика памяти."""
+    n = len(args[1])
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    benchmark.extra_info["logs"] = n
+    benchmark.extra_info["peak_memory_kb"] = round(peak / 1024, 1)
+    warmup = 1 if n <= 10 ** 4 else 0
+    return benchmark.pedantic(fn, args=args, rounds=ROUNDS[n], iterations=1, warmup_rounds=warmup)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_calculate_progress_metrics(benchmark, n):
+    metrics = _run(benchmark, calculate_progress_metrics, make_goal(), make_logs(n), date(2026, 7, 1))
+    assert metrics["actual"] > 0
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_get_daily_progress_series(benchmark, n):
+    series = _run(benchmark, get_daily_progress_series, make_goal(), make_logs(n))
+    assert len(series) == n
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_calculate_weekly_summary(benchmark, n):
+    summary = _run(benchmark, calculate_weekly_summary, make_goal(), make_logs(n), date(2026, 3, 2))
+    assert summary["days_logged"] > 0
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Проверка регрессий бенчмарков: сравнивает результат pytest-benchmark
+(--benchmark-json) с сохранённой базой benchmarks/baseline.json.
+
+    python benchmarks/compare.py bench.json             # код выхода 1 при регрессии
+    python benchmarks/compare.py bench.json --update    # перезаписать базу
+
+Сравнивается медиана времени и пиковая память (extra_info.peak_memory_kb).
+База зависит от машины: обновляйте её на той же машине, где идёт проверка.
+"""
+import argparse
+import json
+import os
+import sys
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Рост памяти меньше этого порога не считается регрессией (шум аллокатора на малых размерах)
+MEMORY_SLACK_KB = 64
+
+
+def load_results(path: str) -> dict:
+    """Результаты pytest-benchmark -> {имя: {"median_s", "peak_memory_kb"}}."""
+    with open(path) as f:
+        data = json.load(f)
+    return {
+        bench["name"]: {
+            "median_s": bench["stats"]["median"],
+            "peak_memory_kb": bench["extra_info"].get("peak_memory_kb")
+        }
+        for bench in data["benchmarks"]
+    }
+
+
+def compare(results: dict, baseline: dict, max_slowdown: float, max_memory_growth: float) -> list:
+    """Список описаний регрессий (пустой, если всё в пределах допусков)."""
+    regressions = []
+    for name, current in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None:
+            print(f"  {name}: нет в базе, пропущен")
+            continue
+
+        ratio = current["median_s"] / base["median_s"]
+        line = f"  {name}: {current['median_s'] * 1000:.3f} мс (база {base['median_s'] * 1000:.3f}, x{ratio:.2f})"
+        if ratio > max_slowdown:
+            regressions.append(f"{name}: время x{ratio:.2f} (допуск x{max_slowdown})")
+
+        memory, base_memory = current["peak_memory_kb"], base.get("peak_memory_kb")
+        if memory is not None and base_memory is not None:
+            line += f", память {memory:.0f} КиБ (база {base_memory:.0f})"
+            if memory > base_memory * max_memory_growth and memory - base_memory > MEMORY_SLACK_KB:
+                regressions.append(f"{name}: память {memory:.0f} КиБ против {base_memory:.0f} КиБ")
+        print(line)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Сравнение бенчмарков с базой")
+    parser.add_argument("results", help="JSON из pytest --benchmark-json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--max-slowdown", type=float, default=1.25, help="Допустимое замедление медианы")
+    parser.add_argument("--max-memory-growth", type=float, default=1.25, help="Допустимый рост пиковой памяти")
+    parser.add_argument("--update", action="store_true", help="Записать результаты как новую базу")
+    args = parser.parse_args()
+
+    results = load_results(args.results)
+
+    if args.update:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"База обновлена: {args.baseline} ({len(results)} бенчмарков)")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.max_slowdown, args.max_memory_growth)
+    if regressions:
+        print("\nРегрессии:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print("\nРегрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
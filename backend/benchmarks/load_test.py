@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный прогон API в процессе, без запущенного сервера.
+
+Приложение (настоящие роутеры) работает на временной SQLite-базе через
+httpx.ASGITransport. База заполняется синтетическими пользователями,
+целями и логами, затем параллельные виртуальные клиенты шлют смешанный
+трафик: дашборд, запись логов, аналитика, генерация плана. Ollama
+заменяется локальной заглушкой. Итог — пропускная способность,
+p50/p95/p99 задержки и число SQL-запросов на запрос (из X-Query-Count)
+по каждой операции; превышение бюджета запросов или ошибки дают код выхода 1.
+
+Запуск из backend/:
+    python benchmarks/load_test.py --users 20 --goals 5 --days 180 --requests 3000 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import numpy as np
+from sqlalchemy import insert
+
+from aggregates import rebuild_daily_rollup, rebuild_progress_totals
+from main import app
+from models import User, Goal, Subgoal, Log, GoalType, GoalUnit
+from routers import ai
+from security import create_token
+from tests.helpers import make_test_client
+
+# Максимум SQL-запросов на один запрос операции (как в test_instrumentation.py)
+QUERY_BUDGETS = {
+    "dashboard: GET /goals/": 1,
+    "dashboard: GET /reports/summary": 1,
+    "analytics: GET /reports/month": 1,
+    "analytics: GET /reports/goal": 1,
+    "history: GET /logs/": 1,
+    "write: POST /logs/": 7,
+    "write: POST /logs/batch": 8,
+    "ai: POST /ai/generate-plan": 0
+}
+
+# Доли операций в смешанном трафике
+TRAFFIC_MIX = {
+    "dashboard: GET /goals/": 30,
+    "dashboard: GET /reports/summary": 20,
+    "analytics: GET /reports/month": 10,
+    "analytics: GET /reports/goal": 10,
+    "history: GET /logs/": 10,
+    "write: POST /logs/": 15,
+    "write: POST /logs/batch": 3,
+    "ai: POST /ai/generate-plan": 2
+}
+
+STUB_PLAN = {
+    "title": "План из заглушки",
+    "target_type": "time",
+    "time_unit": "hours",
+    "end_date": "2030-01-01",
+    "subgoals": [{"title": "Подзадача", "target_type": "time", "target_total": 10}]
+}
+
+CHUNK_SIZE = 5000
+
+
+def seed_dataset(session_factory, users: int, goals_per_user: int, subgoals_per_goal: int,
+                 days: int, density: float, seed: int) -> list:
+    """
+    Заполняет базу: у каждого пользователя goals_per_user целей за последние
+    days дней, по subgoals_per_goal подзадач, лог на подзадачу в день с
+    вероятностью density. Счётчики и daily_rollup пересчитываются из логов.
+    Возвращает [{"token", "goals": [{"id", "subgoals"}]}].
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.now(timezone.utc)
+    period_start = today - timedelta(days=days - 1)
+    period_end = today + timedelta(days=days // 2)
+
+    user_rows, goal_rows, subgoal_rows, log_rows, profiles = [], [], [], [], []
+    for _ in range(users):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        user_rows.append({"id": user_id, "email": f"load-{user_id[:8]}@example.com", "tz": "Europe/Moscow", "created_at": now})
+        profile = {"token": create_token(user_id, "Europe/Moscow"), "goals": []}
+
+        for g in range(goals_per_user):
+            goal_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            is_time = g % 2 == 0
+            goal_rows.append({
+                "id": goal_id, "user_id": user_id, "title": f"Цель {g + 1}",
+                "type": GoalType.TIME if is_time else GoalType.COUNT,
+                "target": float(subgoals_per_goal * 20),
+                "unit": GoalUnit.HOURS if is_time else GoalUnit.COUNT,
+                "period_start": period_start, "period_end": period_end,
+                "priority": rng.randint(1, 3), "created_at": now
+            })
+            subgoal_ids = []
+            for position in range(subgoals_per_goal):
+                subgoal_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                subgoal_ids.append(subgoal_id)
+                subgoal_rows.append({
+                    "id": subgoal_id, "goal_id": goal_id, "title": f"Подзадача {position + 1}",
+                    "target": 20.0, "position": position
+                })
+                for day in range(days):
+                    if rng.random() < density:
+                        log_rows.append({
+                            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                            "goal_id": goal_id, "subgoal_id": subgoal_id,
+                            "log_date": period_start + timedelta(days=day),
+                            "minutes_spent": rng.randint(10, 120) if is_time else 0,
+                            "count_done": 0 if is_time else rng.randint(1, 3),
+                            "created_at": now
+                        })
+            profile["goals"].append({"id": goal_id, "subgoals": subgoal_ids})
+        profiles.append(profile)
+
+    db = session_factory()
+    try:
+        for model, rows in ((User, user_rows), (Goal, goal_rows), (Subgoal, subgoal_rows), (Log, log_rows)):
+            for i in range(0, len(rows), CHUNK_SIZE):
+                db.execute(insert(model), rows[i:i + CHUNK_SIZE])
+        rebuild_progress_totals(db)
+        rebuild_daily_rollup(db)
+        db.commit()
+    finally:
+        db.close()
+
+    print(f"Данные: пользователей {len(user_rows)}, целей {len(goal_rows)}, "
+          f"подзадач {len(subgoal_rows)}, логов {len(log_rows)}")
+    return profiles
+
+
+class _OllamaStub(BaseHTTPRequestHandler):
+    """Отвечает на /api/chat готовым планом в формате Ollama."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.delay)
+        body = json.dumps({"message": {"content": json.dumps(STUB_PLAN)}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_ollama_stub(delay: float) -> ThreadingHTTPServer:
+    """Поднимает заглушку Ollama на свободном порту в фоновом потоке."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaStub)
+    server.delay = delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _build_request(operation: str, profile: dict, rng: random.Random) -> tuple:
+    """(метод, url, тело) для операции от имени пользователя profile."""
+    today = date.today()
+    goal = rng.choice(profile["goals"])
+
+    if operation == "dashboard: GET /goals/":
+        return "GET", "/goals/", None
+    if operation == "dashboard: GET /reports/summary":
+        return "GET", "/reports/summary", None
+    if operation == "analytics: GET /reports/month":
+        month = today - timedelta(days=rng.randint(0, 90))
+        return "GET", f"/reports/month/{month.year}/{month.month}", None
+    if operation == "analytics: GET /reports/goal":
+        return "GET", f"/reports/goal/{goal['id']}", None
+    if operation == "history: GET /logs/":
+        return "GET", f"/logs/?goal_id={goal['id']}&limit=100", None
+    if operation == "write: POST /logs/":
+        return "POST", "/logs/", {
+            "goal_id": goal["id"], "subgoal_id": rng.choice(goal["subgoals"]),
+            "log_date": (today - timedelta(days=rng.randint(0, 6))).isoformat(),
+            "minutes_spent": rng.randint(10, 60), "count_done": rng.randint(0, 2)
+        }
+    if operation == "write: POST /logs/batch":
+        return "POST", "/logs/batch", {"items": [
+            {
+                "goal_id": goal["id"], "subgoal_id": rng.choice(goal["subgoals"]),
+                "log_date": (today - timedelta(days=rng.randint(0, 29))).isoformat(),
+                "minutes_spent": rng.randint(5, 30)
+            }
+            for _ in range(50)
+        ]}
+    if operation == "ai: POST /ai/generate-plan":
+        return "POST", "/ai/generate-plan", {"prompt": "Выучить Python за два месяца"}
+    raise ValueError(f"Неизвестная операция: {operation}")
+
+
+async def _run_traffic(profiles: list, total_requests: int, concurrency: int, seed: int) -> tuple:
+    """Гоняет смешанный трафик; возвращает (выборки по операциям, время прогона)."""
+    operations = list(TRAFFIC_MIX)
+    weights = [TRAFFIC_MIX[op] for op in operations]
+    samples = defaultdict(list)
+
+    async def worker(client: httpx.AsyncClient, index: int, count: int):
+        rng = random.Random(seed * 1000 + index)
+        for _ in range(count):
+            profile = rng.choice(profiles)
+            operation = rng.choices(operations, weights)[0]
+            method, url, body = _build_request(operation, profile, rng)
+            started = time.perf_counter()
+            response = await client.request(
+                method, url, json=body, headers={"Authorization": f"Bearer {profile['token']}"}
+            )
+            latency = time.perf_counter() - started
+            samples[operation].append((latency, response.status_code, int(response.headers.get("X-Query-Count", -1))))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        per_worker = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0) for i in range(concurrency)]
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, i, n) for i, n in enumerate(per_worker)))
+        elapsed = time.perf_counter() - started
+    return samples, elapsed
+
+
+def build_report(samples: dict, elapsed: float) -> dict:
+    """Сводка по операциям: задержки (мс), SQL-запросы, ошибки и нарушения бюджета."""
+    operations = {}
+    for operation, rows in sorted(samples.items()):
+        latencies = np.array([row[0] for row in rows]) * 1000
+        queries = np.array([row[2] for row in rows])
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        operations[operation] = {
+            "requests": len(rows),
+            "errors": sum(1 for row in rows if row[1] >= 400),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "queries_mean": round(float(queries.mean()), 2),
+            "queries_max": int(queries.max()),
+            "query_budget": QUERY_BUDGETS[operation]
+        }
+
+    total = sum(op["requests"] for op in operations.values())
+    return {
+        "requests": total,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 1),
+        "errors": sum(op["errors"] for op in operations.values()),
+        "budget_violations": [
+            name for name, op in operations.items() if op["queries_max"] > op["query_budget"]
+        ],
+        "operations": operations
+    }
+
+
+def print_report(report: dict) -> None:
+    header = f"{'Операция':<34}{'Запросов':>9}{'Ошибок':>8}{'p50 мс':>9}{'p95 мс':>9}{'p99 мс':>9}{'SQL ср':>8}{'SQL макс':>9}{'Бюджет':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, op in report["operations"].items():
+        print(
+            f"{name:<34}{op['requests']:>9}{op['errors']:>8}{op['p50_ms']:>9.1f}{op['p95_ms']:>9.1f}"
+            f"{op['p99_ms']:>9.1f}{op['queries_mean']:>8.1f}{op['queries_max']:>9}{op['query_budget']:>8}"
+        )
+    print(f"\nВсего: {report['requests']} запросов за {report['elapsed_s']} с, "
+          f"{report['throughput_rps']} запросов/с, ошибок: {report['errors']}")
+    if report["budget_violations"]:
+        print(f"Превышен бюджет SQL-запросов: {', '.join(report['budget_violations'])}")
+
+
+def run_load(users: int = 20, goals: int = 5, subgoals: int = 3, days: int = 180, density: float = 0.7,
+             requests: int = 3000, concurrency: int = 16, ollama_delay: float = 0.05, seed: int = 42) -> dict:
+    """Заполняет временную базу, гоняет трафик и возвращает сводку."""
+    client, session_factory = make_test_client()
+    profiles = seed_dataset(session_factory, users, goals, subgoals, days, density, seed)
+
+    stub = start_ollama_stub(ollama_delay)
+    ollama_url = ai.settings.ollama_url
+    ai.settings.ollama_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    try:
+        samples, elapsed = asyncio.run(_run_traffic(profiles, requests, concurrency, seed))
+    finally:
+        ai.settings.ollama_url = ollama_url
+        stub.shutdown()
+        client.close()
+
+    return build_report(samples, elapsed)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон API в процессе")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--goals", type=int, default=5, help="Целей на пользователя")
+    parser.add_argument("--subgoals", type=int, default=3, help="Подзадач на цель")
+    parser.add_argument("--days", type=int, default=180, help="Дней истории логов")
+    parser.add_argument("--density", type=float, default=0.7, help="Вероятность лога на подзадачу в день")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--ollama-delay", type=float, default=0.05, help="Задержка заглушки Ollama, с")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Сохранить сводку в JSON-файл")
+    args = parser.parse_args()
+
+    # Медленные запросы под нагрузкой видны в сводке; построчный лог только мешает
+    logging.getLogger("goalpace.requests").setLevel(logging.ERROR)
+
+    report = run_load(
+        users=args.users, goals=args.goals, subgoals=args.subgoals, days=args.days,
+        density=args.density, requests=args.requests, concurrency=args.concurrency,
+        ollama_delay=args.ollama_delay, seed=args.seed
+    )
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    return 1 if report["errors"] or report["budget_violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Кэш отчётов в памяти процесса и ETag для GET-запросов.
+
+Ключи включают версию данных пользователя: обработчики записи
+(логи, цели) увеличивают версию после коммита, поэтому устаревшие
+записи просто перестают запрашиваться и вытесняются по LRU/TTL.
+Те же версии служат дешёвой меткой изменений для ETag.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from config import get_settings
+from metrics import Counter, Gauge
+
+settings = get_settings()
+
+
+class TTLCache:
+    """LRU-кэш ограниченного размера с временем жизни записей и счётчиками попаданий."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Возвращает значение или None, если записи нет или она устарела."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+_versions: Dict[Tuple[str, str], int] = {}
+_versions_lock = threading.Lock()
+
+# Время последней записи пользователя (time.monotonic) для чтения своих записей
+_last_write: Dict[str, float] = {}
+
+# Версии живут в памяти процесса и после перезапуска начинаются с нуля,
+# поэтому в ETag добавляется идентификатор запуска
+_boot_id = secrets.token_hex(4)
+
+
+def get_data_version(user_id: str) -> int:
+    """Текущая версия данных пользователя (меняется при каждой записи)."""
+    return _versions.get(("user", user_id), 0)
+
+
+def get_goal_version(goal_id: str) -> int:
+    """Текущая версия данных цели (цель, подзадачи, логи)."""
+    return _versions.get(("goal", goal_id), 0)
+
+
+def bump_data_version(user_id: str, goal_ids: Iterable[str] = ()) -> None:
+    """
+    Вызывается после коммита записи: все закэшированные отчёты пользователя
+    и ETag его данных (и затронутых целей) устаревают.
+    """
+    with _versions_lock:
+        for key in [("user", user_id)] + [("goal", goal_id) for goal_id in goal_ids]:
+            _versions[key] = _versions.get(key, 0) + 1
+        _last_write[user_id] = time.monotonic()
+
+
+def wrote_recently(user_id: str, window: float) -> bool:
+    """Была ли у пользователя запись за последние window секунд."""
+    written_at = _last_write.get(user_id)
+    return written_at is not None and time.monotonic() - written_at < window
+
+
+def user_etag(user_id: str) -> str:
+    """Сильный ETag данных пользователя: версия + дата (статусы зависят от сегодняшнего дня)."""
+    return f'"{_boot_id}.{user_id}.{get_data_version(user_id)}.{date.today().isoformat()}"'
+
+
+def goal_etag(user_id: str, goal_id: str) -> str:
+    return f'"{_boot_id}.{user_id}.{goal_id}.{get_goal_version(goal_id)}.{date.today().isoformat()}"'
+
+
+def etag_response(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Ставит ETag в ответ. Если клиент прислал совпадающий If-None-Match,
+    возвращает готовый ответ 304 — обработчик может сразу его вернуть.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+report_cache = TTLCache(maxsize=settings.report_cache_size, ttl=settings.report_cache_ttl)
+
+Counter("goalpace_report_cache_hits_total", "Попадания в кэш отчётов", fn=lambda: report_cache.hits)
+Counter("goalpace_report_cache_misses_total", "Промахи кэша отчётов", fn=lambda: report_cache.misses)
+Gauge("goalpace_report_cache_entries", "Записей в кэше отчётов", fn=lambda: report_cache.stats()["size"])
@@ -4,10 +4,31 @@ from functools import lru_cache
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./goalpace.db"
+    database_async: bool = False
+    database_read_url: str = ""
+    read_your_writes_seconds: float = 5.0
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    sqlite_busy_timeout: int = 5000
+    sqlite_cache_size: int = -64000
+    sqlite_mmap_size: int = 268435456
     timezone: str = "Europe/Moscow"
     cors_origins: str = "http://localhost:3000,http://localhost:5173"
     ollama_url: str = "http://localhost:11434"
     ollama_model: str = "qwen3.5:9b"
+    report_cache_size: int = 1024
+    report_cache_ttl: int = 300
+    slow_request_ms: int = 500
+    profiling_enabled: bool = False
+    profiling_dir: str = "./profiles"
+    profiling_interval_ms: int = 5
+    profiling_token: str = ""
+    profiling_max_files: int = 100
+    secret_key: str = ""
+    token_ttl: int = 30 * 24 * 3600
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,13 @@
+"""
+Общая настройка pytest: временные базы и подмены зависимостей из
+tests.helpers.make_test_client закрываются после каждого теста.
+"""
+import pytest
+
+from tests.helpers import close_test_clients
+
+
+@pytest.fixture(autouse=True)
+def _close_test_clients():
+    yield
+    close_test_clients()
@@ -1,28 +1,236 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import contextvars
+import functools
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional, Union
+
+import anyio
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+from cache import wrote_recently
 from config import get_settings
+from security import InvalidToken, verify_token
 
 settings = get_settings()
 
-db_url = settings.database_url
-if db_url.startswith("postgres://"):
-    db_url = db_url.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(
-    db_url,
-    connect_args={"check_same_thread": False} if "sqlite" in db_url else {}
-)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _normalize_url(url: str) -> str:
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+db_url = _normalize_url(settings.database_url)
+# Реплика только для чтения; без DATABASE_READ_URL чтения идут в основную БД
+read_db_url = _normalize_url(settings.database_read_url) if settings.database_read_url else db_url
+
+
+def _engine_options(url: str) -> dict:
+    """Параметры пула из настроек; для SQLite в памяти пул однопоточный и их не принимает."""
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith("sqlite:")):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Настройки каждого нового соединения SQLite: WAL, чтобы чтения не ждали
+    записи логов, synchronous=NORMAL (в WAL это безопасно), ожидание
+    блокировки вместо мгновенного "database is locked", кэш страниц и mmap.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.close()
+
+
+def set_sqlite_read_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Настройки соединения с репликой SQLite: журнал не переключается
+    (с mode=ro это запрещено), а query_only запрещает запись, даже если
+    реплика открыта как обычный файл.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.close()
+
+
+def _listen_sqlite_pragmas(engine, read_only: bool) -> None:
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", set_sqlite_read_pragmas if read_only else set_sqlite_pragmas)
+
+
+def _make_engine(url: str, read_only: bool = False):
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if "sqlite" in url else {},
+        **_engine_options(url)
+    )
+    _listen_sqlite_pragmas(engine, read_only)
+    return engine
+
+
+engine = _make_engine(db_url)
+read_engine = _make_engine(read_db_url, read_only=True) if read_db_url != db_url else engine
+
+# Объекты после коммита не истекают: обработчики отдают их наружу из run_sync,
+# и сериализация ответа не должна снова ходить в БД
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
 
 
 class Base(DeclarativeBase):
     pass
 
 
-def get_db():
-    db = SessionLocal()
+class SyncSessionAdapter:
+    """
+    Синхронная сессия с тем же интерфейсом run_sync, что у AsyncSession:
+    функция выполняется в пуле потоков с копией contextvars запроса.
+    Роутеры пишут запросы один раз и работают в обоих режимах.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def run_sync(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, fn, self.sync_session, *args, **kwargs)
+        return await anyio.to_thread.run_sync(call)
+
+    async def close(self) -> None:
+        await anyio.to_thread.run_sync(self.sync_session.close)
+
+
+def _async_url(url: str) -> str:
+    """URL с асинхронным драйвером: sqlite+aiosqlite или postgresql+asyncpg."""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+def _make_async_engine(url: str, read_only: bool = False):
+    # Драйвер (aiosqlite / asyncpg) импортируется только в асинхронном режиме
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    async_options = _engine_options(url)
+    if async_options and url.startswith("sqlite"):
+        # Для aiosqlite по умолчанию NullPool (новое соединение на каждый запрос)
+        async_options["poolclass"] = AsyncAdaptedQueuePool
+    async_engine = create_async_engine(_async_url(url), **async_options)
+    _listen_sqlite_pragmas(async_engine.sync_engine, read_only)
+    return async_engine
+
+
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if settings.database_async:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = _make_async_engine(db_url)
+    async_read_engine = (
+        _make_async_engine(read_db_url, read_only=True) if read_db_url != db_url else async_engine
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+DbSession = Union[AsyncSession, SyncSessionAdapter]
+
+
+async def dispose_engines() -> None:
+    """Закрывает соединения пулов при остановке приложения."""
+    if AsyncSessionLocal is not None:
+        await async_engine.dispose()
+        if async_read_engine is not async_engine:
+            await async_read_engine.dispose()
+    engine.dispose()
+    if read_engine is not engine:
+        read_engine.dispose()
+
+
+@asynccontextmanager
+async def _session_scope(async_factory, sync_factory):
+    if async_factory is not None:
+        async with async_factory() as session:
+            yield session
+        return
+
+    db = SyncSessionAdapter(sync_factory())
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
+
+
+async def get_db():
+    """
+    Сессия для роутеров: AsyncSession при DATABASE_ASYNC=true,
+    иначе синхронная сессия за SyncSessionAdapter. Запросы выполняются
+    через await db.run_sync(функция, ...), где функция получает обычную Session.
+    """
+    async with _session_scope(AsyncSessionLocal, SessionLocal) as db:
+        yield db
+
+
+def _request_user_id(request: Request) -> Optional[str]:
+    """id пользователя из токена запроса или None (отказ в доступе — забота get_current_user)."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    try:
+        return verify_token(token)["sub"]
+    except InvalidToken:
+        return None
+
+
+def reads_from_primary(request: Request) -> bool:
+    """
+    Чтение своих записей: READ_YOUR_WRITES_SECONDS после записи пользователя
+    его чтения идут в основную БД. Иначе отстающая реплика отдала бы старые
+    данные, а кэш отчётов и ETag сохранили бы их под новой версией данных.
+    """
+    user_id = _request_user_id(request)
+    return user_id is not None and wrote_recently(user_id, settings.read_your_writes_seconds)
+
+
+async def get_read_db(request: Request):
+    """
+    Сессия только для чтения (GET-обработчики и отчёты): идёт в реплику
+    из DATABASE_READ_URL, если она задана, иначе в основную БД.
+    Сразу после записи пользователя — в основную БД (см. reads_from_primary).
+    Записи и чтение-перед-записью — только через get_db.
+    """
+    if reads_from_primary(request):
+        scope = _session_scope(AsyncSessionLocal, SessionLocal)
+    else:
+        scope = _session_scope(AsyncReadSessionLocal, ReadSessionLocal)
+    async with scope as db:
+        yield db
+
+
+def dialect_insert(db: Session):
+    """Возвращает insert() диалекта текущей БД (с поддержкой ON CONFLICT)."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Upsert не поддерживается для диалекта {dialect}")
@@ -0,0 +1,177 @@
+"""
+Учёт SQL-запросов на каждый HTTP-запрос.
+
+Хуки before/after_cursor_execute считают запросы и время в БД в объект
+статистики текущего запроса (contextvar: SyncSessionAdapter и run_sync
+AsyncSession выполняют функции с копией контекста запроса, поэтому
+счётчики видны из пула потоков). Middleware отдаёт их в заголовках
+Server-Timing и X-Query-Count и пишет в лог медленные запросы.
+MetricsMiddleware копит те же данные в метриках /metrics по шаблону маршрута.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import get_settings
+from metrics import Counter, Gauge, Histogram
+
+settings = get_settings()
+
+logger = logging.getLogger("goalpace.requests")
+
+http_requests_total = Counter(
+    "goalpace_http_requests_total", "Число HTTP-запросов", ["method", "route", "status"]
+)
+http_request_duration = Histogram(
+    "goalpace_http_request_duration_seconds", "Длительность HTTP-запросов", ["method", "route"]
+)
+http_requests_in_progress = Gauge(
+    "goalpace_http_requests_in_progress", "HTTP-запросы в обработке", ["method"]
+)
+db_queries_total = Counter(
+    "goalpace_db_queries_total", "Число SQL-запросов по маршрутам", ["route"]
+)
+db_duration_seconds_total = Counter(
+    "goalpace_db_duration_seconds_total", "Суммарное время в БД по маршрутам", ["route"]
+)
+
+
+@dataclass
+class QueryStats:
+    """Число SQL-запросов и суммарное время в БД (секунды) за один HTTP-запрос."""
+    count: int = 0
+    db_time: float = 0.0
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Статистика текущего HTTP-запроса или None вне запроса."""
+    return _current_stats.get()
+
+
+# Время старта хранится в контексте выполнения, а не на соединении: при ошибке
+# after_cursor_execute не вызывается, и запись на пуловом соединении осталась бы навсегда
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _record_query(context) -> None:
+    started = getattr(context, "_query_started", None)
+    stats = _current_stats.get()
+    if started is not None and stats is not None:
+        stats.count += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(context)
+
+
+def _handle_error(exception_context):
+    """Упавший запрос (нарушение ограничения, таймаут блокировки) тоже учитывается."""
+    _record_query(exception_context.execution_context)
+
+
+def install_query_hooks(target=Engine) -> None:
+    """
+    Подключает хуки учёта запросов. По умолчанию — ко всем Engine,
+    включая sync_engine асинхронных движков и движки тестов.
+    """
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+        event.listen(target, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI-middleware: заголовки Server-Timing (db и app, мс) и X-Query-Count.
+    Заголовки отправляются до тела, поэтому для потоковых ответов (NDJSON)
+    в них попадают только запросы до начала ответа; в лог медленных
+    запросов попадает полный итог.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(stats.count).encode()))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.db_time * 1000:.1f};desc="{stats.count} queries", '
+                    f"app;dur={elapsed_ms:.1f}".encode()
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_stats.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if settings.slow_request_ms and elapsed_ms >= settings.slow_request_ms:
+                logger.warning(
+                    "Медленный запрос %s %s: %.0f мс, SQL-запросов: %d (%.0f мс)",
+                    scope["method"], scope["path"], elapsed_ms, stats.count, stats.db_time * 1000
+                )
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware метрик HTTP: счётчик по маршруту и статусу, гистограмма
+    длительности, запросы в обработке и время в БД. Маршрут — шаблон пути
+    (/goals/{goal_id}), чтобы число рядов не зависело от id; запросы мимо
+    маршрутов считаются как "unmatched". Должна стоять внутри
+    QueryStatsMiddleware, чтобы видеть статистику SQL текущего запроса.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc(method=method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec(method=method)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_requests_total.inc(method=method, route=route, status=str(status))
+            http_request_duration.observe(time.perf_counter() - started, method=method, route=route)
+            stats = _current_stats.get()
+            if stats is not None and stats.count:
+                db_queries_total.inc(stats.count, route=route)
+                db_duration_seconds_total.inc(stats.db_time, route=route)
@@ -1,12 +1,26 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from config import get_settings
+from database import dispose_engines
+from instrumentation import MetricsMiddleware, QueryStatsMiddleware, install_query_hooks
+from metrics import CONTENT_TYPE, render_metrics
+from profiling import ProfilingMiddleware
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await dispose_engines()
+
+
 app = FastAPI(
     title="GoalPace API",
     description="API для планирования учебных целей и трекинга прогресса",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -17,6 +31,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+install_query_hooks()
+# Последний добавленный middleware — внешний: метрики читают статистику SQL запроса
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
 from routers import auth, goals, logs, reports, ai
 app.include_router(auth.router)
 app.include_router(goals.router)
@@ -33,3 +54,9 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Метрики процесса в текстовом формате Prometheus."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -1,3 +1,3 @@
-from .models import User, Goal, Log, Subgoal, GoalType, GoalUnit
+from .models import User, Goal, Log, Subgoal, DailyRollup, GoalType, GoalUnit
 
-__all__ = ["User", "Goal", "Log", "Subgoal", "GoalType", "GoalUnit"]
+__all__ = ["User", "Goal", "Log", "Subgoal", "DailyRollup", "GoalType", "GoalUnit"]
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, date, timezone
-from sqlalchemy import Column, String, Integer, Float, Date, DateTime, ForeignKey, Enum, UniqueConstraint
+from sqlalchemy import Column, String, Integer, Float, Date, DateTime, ForeignKey, Enum, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 import enum
 from database import Base
@@ -26,6 +26,10 @@ class User(Base):
 
     goals = relationship("Goal", back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('ix_users_email', 'email', unique=True),
+    )
+
 
 class Goal(Base):
     __tablename__ = "goals"
@@ -41,11 +45,21 @@ class Goal(Base):
     priority = Column(Integer, default=2)
     notes = Column(String, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # Накопленные суммы из логов, обновляются при каждой записи лога
+    total_minutes = Column(Integer, nullable=False, default=0, server_default="0")
+    total_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="goals")
     logs = relationship("Log", back_populates="goal", cascade="all, delete-orphan")
     subgoals = relationship("Subgoal", back_populates="goal", cascade="all, delete-orphan", order_by="Subgoal.position")
 
+    __table_args__ = (
+        # Список целей пользователя: ORDER BY priority DESC, created_at DESC
+        Index('ix_goals_user_id_priority_created_at', 'user_id', 'priority', 'created_at'),
+        # Активные цели: user_id + period_end >= сегодня
+        Index('ix_goals_user_id_period_end', 'user_id', 'period_end'),
+    )
+
 
 class Subgoal(Base):
     __tablename__ = "subgoals"
@@ -55,10 +69,16 @@ class Subgoal(Base):
     title = Column(String, nullable=False)
     target = Column(Float, nullable=False)
     position = Column(Integer, default=0)
+    total_minutes = Column(Integer, nullable=False, default=0, server_default="0")
+    total_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     goal = relationship("Goal", back_populates="subgoals")
     logs = relationship("Log", back_populates="subgoal", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('ix_subgoals_goal_id_position', 'goal_id', 'position'),
+    )
+
 
 class Log(Base):
     __tablename__ = "logs"
@@ -77,4 +97,28 @@ class Log(Base):
 
     __table_args__ = (
         UniqueConstraint('goal_id', 'subgoal_id', 'log_date', name='uq_goal_subgoal_log_date'),
+        # NULL в subgoal_id не участвует в уникальности, поэтому для логов
+        # без подзадачи нужен отдельный частичный индекс (цель для ON CONFLICT)
+        Index(
+            'uq_goal_log_date_no_subgoal', 'goal_id', 'log_date',
+            unique=True,
+            sqlite_where=text('subgoal_id IS NULL'),
+            postgresql_where=text('subgoal_id IS NULL')
+        ),
+        Index('ix_logs_subgoal_id', 'subgoal_id'),
+        # GET /logs?goal_id=...: ORDER BY log_date DESC, id DESC
+        Index('ix_logs_goal_id_log_date_id', 'goal_id', 'log_date', 'id'),
+        # GET /logs без фильтров (пагинация по ключу) и выборки по дням
+        Index('ix_logs_log_date_id', 'log_date', 'id'),
     )
+
+
+class DailyRollup(Base):
+    """Подневные итоги пользователя: пересчитываются при каждой записи лога."""
+    __tablename__ = "daily_rollup"
+
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    minutes = Column(Integer, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+    goals_active = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,161 @@
+"""
+Сэмплирующий профилировщик отдельных запросов.
+
+Включается настройкой PROFILING_ENABLED: тогда main.py добавляет
+ProfilingMiddleware, и запрос с заголовком X-Profile, равным PROFILING_TOKEN,
+профилируется целиком. Во время запроса отдельный поток
+периодически снимает стеки всех потоков (sys._current_frames), стеки
+простаивающих потоков отбрасываются. Результат — файл в формате
+collapsed stacks ("кадр;кадр;кадр число"), который открывают
+flamegraph.pl и speedscope. Имя файла приходит в заголовке X-Profile-File.
+В PROFILING_DIR остаются PROFILING_MAX_FILES последних профилей.
+
+Без настройки middleware не регистрируется, и обычные запросы ничего не платят.
+"""
+import hmac
+import logging
+import os
+import sys
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+import anyio
+
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger("goalpace.profiling")
+
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Верхний кадр в этих модулях — поток ждёт (пул потоков, цикл событий)
+_IDLE_MODULES = {"threading.py", "selectors.py", "queue.py"}
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_BACKEND_DIR):
+        return os.path.relpath(filename, _BACKEND_DIR)
+    if "site-packages" in filename:
+        return filename.split("site-packages" + os.sep, 1)[1]
+    return os.path.basename(filename)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{frame.f_lineno})"
+
+
+class StackSampler:
+    """
+    Фоновый поток, который раз в interval секунд снимает стеки всех потоков
+    и считает одинаковые стеки. Потоки помечаются именем в корне стека.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="goalpace-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(own_id)
+
+    def _sample(self, own_id: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        self.samples += 1
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or os.path.basename(frame.f_code.co_filename) in _IDLE_MODULES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Стеки в формате collapsed: корень первым, число сэмплов через пробел."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _wants_profile(scope, token: bytes) -> bool:
+    """Профилируются только запросы с секретом в X-Profile: иначе любой клиент запускал бы сэмплер."""
+    if not token:
+        return False
+    for name, value in scope.get("headers", []):
+        if name == b"x-profile":
+            return hmac.compare_digest(value.strip(), token)
+    return False
+
+
+def _prune_profiles(profiles_dir: str, max_files: int) -> None:
+    """Удаляет самые старые профили сверх max_files (имена начинаются с времени, сортируются по нему)."""
+    names = sorted(name for name in os.listdir(profiles_dir) if name.endswith(".collapsed"))
+    for name in names[:max(len(names) - max_files, 0)]:
+        os.remove(os.path.join(profiles_dir, name))
+
+
+def _profile_name(scope) -> str:
+    slug = scope["path"].strip("/").replace("/", "_") or "root"
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    return f"{stamp}-{scope['method']}-{slug}-{uuid.uuid4().hex[:6]}.collapsed"
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware: профилирует запросы с X-Profile: <PROFILING_TOKEN>
+    и сохраняет стеки в PROFILING_DIR. Профиль покрывает весь запрос,
+    включая потоковую отдачу тела, поэтому файл дописывается после ответа.
+    Одновременные запросы из других потоков тоже могут попасть в профиль.
+    """
+
+    def __init__(self, app, profiles_dir: Optional[str] = None, token: Optional[str] = None,
+                 max_files: Optional[int] = None):
+        self.app = app
+        self.profiles_dir = profiles_dir or settings.profiling_dir
+        self.token = (settings.profiling_token if token is None else token).encode()
+        self.max_files = settings.profiling_max_files if max_files is None else max_files
+        if not self.token:
+            logger.warning("PROFILING_TOKEN не задан: профилирование запросов отключено")
+
+    def _finish(self, sampler: StackSampler, name: str) -> None:
+        """Останавливает сэмплер и сохраняет профиль (в пуле потоков, не в цикле событий)."""
+        sampler.stop()
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        with open(os.path.join(self.profiles_dir, name), "w") as f:
+            f.write(sampler.collapsed())
+        _prune_profiles(self.profiles_dir, self.max_files)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope, self.token):
+            await self.app(scope, receive, send)
+            return
+
+        name = _profile_name(scope)
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-file", name.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = StackSampler(settings.profiling_interval_ms / 1000)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            await anyio.to_thread.run_sync(self._finish, sampler, name)
@@ -2,7 +2,10 @@
 Расчёт прогресса целей: красная линия, дефицит, статус
 """
 from datetime import date, datetime
-from typing import List, Tuple
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
 from models.models import Goal, Log, GoalType
 
 
@@ -21,6 +24,17 @@ def calculate_progress_metrics(goal: Goal, logs: List[Log], current_date: date =
     - days_total: общая длительность периода
     - days_remaining: дней осталось до конца
     """
+    total_minutes, total_count = sum_log_totals(logs)
+    return calculate_progress_metrics_from_totals(goal, total_minutes, total_count, current_date)
+
+
+def calculate_progress_metrics_from_totals(
+    goal: Goal, total_minutes: int, total_count: int, current_date: date = None
+) -> dict:
+    """
+    То же, что calculate_progress_metrics, но по готовым суммам из логов
+    (например, посчитанным в БД через SUM ... GROUP BY goal_id)
+    """
     if current_date is None:
         current_date = date.today()
     
@@ -43,7 +57,7 @@ def calculate_progress_metrics(goal: Goal, logs: List[Log], current_date: date =
         days_remaining = 0
     
     # Фактический прогресс
-    actual = calculate_actual_progress(goal, logs)
+    actual = actual_from_totals(goal, total_minutes, total_count)
     
     # Красная линия (норма на сегодня)
     required_by_today = (target * days_elapsed) / days_total if days_total > 0 else 0
@@ -74,11 +88,26 @@ def calculate_actual_progress(goal: Goal, logs: List[Log]) -> float:
     Для time-целей возвращает часы (из минут)
     Для count-целей возвращает количество
     """
+    total_minutes, total_count = sum_log_totals(logs)
+    return actual_from_totals(goal, total_minutes, total_count)
+
+
+def sum_log_totals(logs: List[Log]) -> Tuple[int, int]:
+    """Суммы минут и количества по списку логов."""
+    total_minutes = sum(log.minutes_spent for log in logs)
+    total_count = sum(log.count_done for log in logs)
+    return total_minutes, total_count
+
+
+def actual_from_totals(goal: Goal, total_minutes: int, total_count: int) -> float:
+    """
+    Переводит суммы из логов в фактический прогресс цели:
+    часы для time-целей, количество для count-целей
+    """
     if goal.type == GoalType.TIME:
-        total_minutes = sum(log.minutes_spent for log in logs)
         return total_minutes / 60.0  # переводим в часы
     else:  # COUNT
-        return float(sum(log.count_done for log in logs))
+        return float(total_count)
 
 
 def determine_status(actual: float, required: float, target: float, days_remaining: int) -> str:
@@ -108,6 +137,98 @@ def determine_status(actual: float, required: float, target: float, days_remaini
         return "behind"
 
 
+def calculate_progress_metrics_batch(
+    goals: Sequence,
+    total_minutes: Sequence[float],
+    total_count: Sequence[float],
+    current_date: date = None
+) -> Dict[str, np.ndarray]:
+    """
+    Пакетный расчёт метрик прогресса сразу для многих целей
+
+    goals — цели (ORM-объекты или строки запроса с полями type, target,
+    period_start, period_end), total_minutes / total_count — суммы из логов
+    по каждой цели в том же порядке.
+
+    Возвращает словарь с теми же ключами, что и calculate_progress_metrics,
+    но значения — массивы NumPy длины len(goals).
+    """
+    if current_date is None:
+        current_date = date.today()
+
+    n = len(goals)
+    today = current_date.toordinal()
+    starts = np.fromiter((g.period_start.toordinal() for g in goals), dtype=np.int64, count=n)
+    ends = np.fromiter((g.period_end.toordinal() for g in goals), dtype=np.int64, count=n)
+    targets = np.fromiter((g.target for g in goals), dtype=np.float64, count=n)
+    is_time = np.fromiter((g.type == GoalType.TIME for g in goals), dtype=bool, count=n)
+
+    # Считаем дни (те же правила, что и в calculate_progress_metrics)
+    days_total = ends - starts + 1
+    days_elapsed = np.clip(today - starts + 1, 0, days_total)
+    days_remaining = np.maximum(0, ends - today)
+
+    # Фактический прогресс: часы для time-целей, количество для count-целей
+    minutes = np.asarray(total_minutes, dtype=np.float64)
+    counts = np.asarray(total_count, dtype=np.float64)
+    actual = np.where(is_time, minutes / 60.0, counts)
+
+    # Красная линия, дефицит и процент
+    required_by_today = np.divide(
+        targets * days_elapsed, days_total,
+        out=np.zeros(n), where=days_total > 0
+    )
+    deficit = required_by_today - actual
+    percent = np.divide(actual, targets, out=np.zeros(n), where=targets > 0) * 100
+
+    status = determine_status_batch(actual, required_by_today, targets, days_remaining)
+
+    return {
+        "actual": _round_array(actual, 2),
+        "target": _round_array(targets, 2),
+        "required_by_today": _round_array(required_by_today, 2),
+        "deficit": _round_array(deficit, 2),
+        "percent": _round_array(percent, 1),
+        "status": status,
+        "days_elapsed": days_elapsed,
+        "days_total": days_total,
+        "days_remaining": days_remaining
+    }
+
+
+def _round_array(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    Округление встроенным round, как в calculate_progress_metrics_from_totals.
+    np.round (умножение, округление, деление) иногда расходится с ним
+    в последнем знаке, и сводка не совпадала бы с отчётом по цели.
+    """
+    return np.array([round(value, ndigits) for value in values.tolist()], dtype=np.float64)
+
+
+def determine_status_batch(
+    actual: np.ndarray,
+    required: np.ndarray,
+    target: np.ndarray,
+    days_remaining: np.ndarray
+) -> np.ndarray:
+    """
+    Векторная версия determine_status: те же пороги 15% и 35%
+    """
+    lag_percent = np.divide(
+        required - actual, required,
+        out=np.zeros(len(actual)), where=required > 0
+    ) * 100
+
+    status = np.where(
+        (actual >= required) | (lag_percent <= 15), "on_track",
+        np.where(lag_percent <= 35, "at_risk", "behind")
+    )
+
+    # Период закончился — важен только итог
+    finished = np.where(actual >= target, "on_track", "behind")
+    return np.where(days_remaining == 0, finished, status)
+
+
 def get_daily_progress_series(goal: Goal, logs: List[Log]) -> List[dict]:
     """
     Возвращает дневную серию прогресса для графиков
@@ -0,0 +1,35 @@
+"""
+Пересчёт счётчиков прогресса (total_minutes / total_count)
+и подневной сводки daily_rollup из логов.
+
+Запуск: python rebuild_progress.py [goal_id ...]
+Без аргументов пересчитываются все цели и вся сводка.
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal
+from aggregates import rebuild_progress_totals, rebuild_daily_rollup
+from models import Goal
+
+
+def rebuild(goal_ids=None):
+    db = SessionLocal()
+    try:
+        rebuild_progress_totals(db, goal_ids)
+        if goal_ids:
+            user_ids = {user_id for (user_id,) in db.query(Goal.user_id).filter(Goal.id.in_(goal_ids))}
+            rebuild_daily_rollup(db, user_ids)
+        else:
+            rebuild_daily_rollup(db)
+        db.commit()
+        target = f"целей: {len(goal_ids)}" if goal_ids else "все цели"
+        print(f"Счётчики прогресса пересчитаны ({target})")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild(sys.argv[1:] or None)
@@ -1,14 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends
 from schemas import AIPlanRequest, AIPlanResponse
 from config import get_settings
+from metrics import Histogram
 import httpx
 import json
 import re
 import datetime
+import time
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 settings = get_settings()
 
+ollama_request_duration = Histogram(
+    "goalpace_ollama_request_duration_seconds", "Длительность запросов к Ollama", ["outcome"]
+)
+
 SYSTEM_PROMPT = """Ты - персональный архитектор целей. Проанализируй запрос пользователя и составь структурированный план.
 
 ПРАВИЛА ВЫБОРА target_type:
@@ -67,8 +73,14 @@ async def generate_plan(request: AIPlanRequest):
 
     try:
         async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(f"{settings.ollama_url}/api/chat", json=payload)
-            response.raise_for_status()
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                response = await client.post(f"{settings.ollama_url}/api/chat", json=payload)
+                response.raise_for_status()
+                outcome = "ok"
+            finally:
+                ollama_request_duration.observe(time.perf_counter() - started, outcome=outcome)
             
             data = response.json()
             ai_content = data.get("message", {}).get("content", "")
@@ -1,40 +1,82 @@
 """
 Роутер для демо-авторизации
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
-from database import get_db
+from database import DbSession, get_db, dialect_insert
 from models import User
-from schemas import UserCreate, UserResponse
+from schemas import UserCreate, UserResponse, AuthResponse
+from security import InvalidToken, create_token, verify_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+bearer_scheme = HTTPBearer(auto_error=False)
 
-def get_current_user(
-    user_id: str = Query(..., description="ID пользователя для авторизации"),
-    db: Session = Depends(get_db)
-) -> User:
-    """Зависимость для получения текущего пользователя по ID."""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="Пользователь не найден или не авторизован")
-    return user
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """Пользователь из проверенного токена (без обращения к БД)."""
+    id: str
+    tz: str
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> CurrentUser:
+    """
+    Зависимость для получения текущего пользователя по токену из заголовка Authorization.
+    Проверка токена — только вычисления, поэтому async: без перехода в пул потоков.
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Требуется авторизация",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+    try:
+        payload = verify_token(credentials.credentials)
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+
+    return CurrentUser(id=payload["sub"], tz=payload["tz"])
 
-@router.post("/demo", response_model=UserResponse)
-def get_or_create_demo_user(user_data: UserCreate, db: Session = Depends(get_db)):
-    """Создает или возвращает демо-пользователя по email."""
+
+@router.post("/demo", response_model=AuthResponse)
+async def get_or_create_demo_user(user_data: UserCreate, db: DbSession = Depends(get_db)):
+    """
+    Создает или возвращает демо-пользователя по email вместе с токеном сессии.
+    Для email это INSERT ... ON CONFLICT (email) DO NOTHING по уникальному
+    индексу, поэтому одновременные входы не создают дублей.
+    """
+    user = await db.run_sync(_get_or_create_user, user_data)
+    return {
+        **UserResponse.model_validate(user).model_dump(),
+        "token": create_token(user.id, user.tz)
+    }
+
+
+def _get_or_create_user(db: Session, user_data: UserCreate) -> User:
     if user_data.email:
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
-        if existing_user:
-            return existing_user
-    
-    new_user = User(
-        email=user_data.email,
-        tz=user_data.tz
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    return new_user
+        # DO NOTHING не пишет строку при повторном входе; RETURNING тогда пуст,
+        # и пользователь читается обычным SELECT
+        stmt = dialect_insert(db)(User).values(email=user_data.email, tz=user_data.tz)
+        stmt = stmt.on_conflict_do_nothing(index_elements=["email"]).returning(User)
+        user = db.scalars(stmt).one_or_none()
+        if user is None:
+            user = db.query(User).filter(User.email == user_data.email).one()
+        db.commit()
+    else:
+        user = User(
+            email=user_data.email,
+            tz=user_data.tz
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+
+    return user
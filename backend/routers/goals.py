@@ -1,31 +1,27 @@
 """
 Роутер для работы с целями (CRUD)
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session, joinedload
 from typing import List
 from datetime import date
 
-from database import get_db
-from models import Goal, User, Subgoal, Log, GoalType
+from database import DbSession, get_db, get_read_db
+from models import Goal, User, Subgoal, Log
 from schemas import GoalCreate, GoalUpdate, GoalResponse, SubgoalRead
+from progress import actual_from_totals
+from aggregates import apply_progress_deltas, refresh_daily_rollup
+from cache import bump_data_version, user_etag, goal_etag, etag_response
+from routers.auth import CurrentUser, get_current_user
 
 router = APIRouter(prefix="/goals", tags=["goals"])
 
 
-def _calc_subgoal_current(subgoal: Subgoal, goal_type: GoalType, db: Session) -> float:
-    """Считает текущий прогресс подзадачи из связанных логов."""
-    logs = db.query(Log).filter(Log.subgoal_id == subgoal.id).all()
-    if goal_type == GoalType.TIME:
-        return sum(log.minutes_spent for log in logs) / 60.0
-    return float(sum(log.count_done for log in logs))
-
-
-def _goal_to_response(goal: Goal, db: Session) -> dict:
+def _goal_to_response(goal: Goal) -> dict:
     """Преобразует ORM-объект цели в словарь с подзадачами и их прогрессом."""
     plan = []
     for sub in goal.subgoals:
-        current = _calc_subgoal_current(sub, goal.type, db)
+        current = actual_from_totals(goal, sub.total_minutes, sub.total_count)
         plan.append(SubgoalRead(
             id=sub.id,
             title=sub.title,
@@ -50,9 +46,17 @@ def _goal_to_response(goal: Goal, db: Session) -> dict:
 
 
 @router.post("/", response_model=GoalResponse, status_code=201)
-def create_goal(goal_data: GoalCreate, user_id: str = Query(...), db: Session = Depends(get_db)):
+async def create_goal(
+    goal_data: GoalCreate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
     """Создает цель вместе со списком подзадач в одной транзакции."""
-    user = db.query(User).filter(User.id == user_id).first()
+    return await db.run_sync(_create_goal, goal_data, current_user.id)
+
+
+def _create_goal(db: Session, goal_data: GoalCreate, user_id: str) -> dict:
+    user = db.query(User.id).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
     
@@ -83,18 +87,29 @@ def create_goal(goal_data: GoalCreate, user_id: str = Query(...), db: Session =
         db.add(subgoal)
     
     db.commit()
+    bump_data_version(user_id)
     db.refresh(new_goal)
     
-    return _goal_to_response(new_goal, db)
+    return _goal_to_response(new_goal)
 
 
 @router.get("/", response_model=List[GoalResponse])
-def get_goals(
-    user_id: str = Query(...),
+async def get_goals(
+    request: Request,
+    response: Response,
     active_only: bool = Query(False, description="Показать только активные цели"),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_read_db)
 ):
-    """Возвращает список целей пользователя с подзадачами."""
+    """Возвращает список целей пользователя с подзадачами (поддерживает If-None-Match)."""
+    not_modified = etag_response(request, response, user_etag(current_user.id))
+    if not_modified:
+        return not_modified
+    
+    return await db.run_sync(_get_goals, current_user.id, active_only)
+
+
+def _get_goals(db: Session, user_id: str, active_only: bool) -> List[dict]:
     query = db.query(Goal).options(joinedload(Goal.subgoals)).filter(Goal.user_id == user_id)
     
     if active_only:
@@ -102,25 +117,50 @@ def get_goals(
         query = query.filter(Goal.period_end >= today)
     
     goals = query.order_by(Goal.priority.desc(), Goal.created_at.desc()).all()
-    return [_goal_to_response(g, db) for g in goals]
+    return [_goal_to_response(g) for g in goals]
 
 
 @router.get("/{goal_id}", response_model=GoalResponse)
-def get_goal(goal_id: str, db: Session = Depends(get_db)):
-    """Возвращает одну цель по ID с подзадачами."""
-    goal = db.query(Goal).options(joinedload(Goal.subgoals)).filter(Goal.id == goal_id).first()
+async def get_goal(
+    goal_id: str,
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_read_db)
+):
+    """Возвращает одну цель по ID с подзадачами (поддерживает If-None-Match)."""
+    not_modified = etag_response(request, response, goal_etag(current_user.id, goal_id))
+    if not_modified:
+        return not_modified
+    
+    return await db.run_sync(_get_goal, goal_id, current_user.id)
+
+
+def _get_goal(db: Session, goal_id: str, user_id: str) -> dict:
+    goal = db.query(Goal).options(joinedload(Goal.subgoals)).filter(
+        Goal.id == goal_id, Goal.user_id == user_id
+    ).first()
     if not goal:
         raise HTTPException(status_code=404, detail="Цель не найдена")
     
-    return _goal_to_response(goal, db)
+    return _goal_to_response(goal)
 
 
 @router.put("/{goal_id}", response_model=GoalResponse)
-def update_goal(
-    goal_id: str, goal_data: GoalUpdate, db: Session = Depends(get_db)
+async def update_goal(
+    goal_id: str,
+    goal_data: GoalUpdate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
 ):
     """Обновляет поля цели (частичное обновление)."""
-    goal = db.query(Goal).options(joinedload(Goal.subgoals)).filter(Goal.id == goal_id).first()
+    return await db.run_sync(_update_goal, goal_id, goal_data, current_user.id)
+
+
+def _update_goal(db: Session, goal_id: str, goal_data: GoalUpdate, user_id: str) -> dict:
+    goal = db.query(Goal).options(joinedload(Goal.subgoals)).filter(
+        Goal.id == goal_id, Goal.user_id == user_id
+    ).first()
     if not goal:
         raise HTTPException(status_code=404, detail="Цель не найдена")
     
@@ -165,9 +205,20 @@ def update_goal(
 
             total_target += target
 
-        for existing_sub in list(goal.subgoals):
-            if existing_sub.id not in incoming_ids:
+        removed = [sub for sub in goal.subgoals if sub.id not in incoming_ids]
+        if removed:
+            removed_days = [d for (d,) in db.query(Log.log_date).filter(
+                Log.subgoal_id.in_([sub.id for sub in removed])
+            ).distinct()]
+            removed_minutes = sum(sub.total_minutes for sub in removed)
+            removed_count = sum(sub.total_count for sub in removed)
+            for existing_sub in removed:
                 db.delete(existing_sub)
+            
+            # Логи удалённых подзадач удаляются каскадом — вычитаем их из счётчиков цели
+            apply_progress_deltas(db, {goal.id: (-removed_minutes, -removed_count)})
+            db.flush()
+            refresh_daily_rollup(db, goal.user_id, removed_days)
 
         goal.target = round(total_target, 2)
     
@@ -176,18 +227,30 @@ def update_goal(
     
     db.commit()
     db.refresh(goal)
+    bump_data_version(goal.user_id, [goal.id])
     
-    return _goal_to_response(goal, db)
+    return _goal_to_response(goal)
 
 
 @router.delete("/{goal_id}", status_code=204)
-def delete_goal(goal_id: str, db: Session = Depends(get_db)):
+async def delete_goal(
+    goal_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
     """Удаляет цель и все связанные подзадачи и логи."""
-    goal = db.query(Goal).filter(Goal.id == goal_id).first()
+    await db.run_sync(_delete_goal, goal_id, current_user.id)
+    return None
+
+
+def _delete_goal(db: Session, goal_id: str, user_id: str) -> None:
+    goal = db.query(Goal).filter(Goal.id == goal_id, Goal.user_id == user_id).first()
     if not goal:
         raise HTTPException(status_code=404, detail="Цель не найдена")
     
+    logged_days = [d for (d,) in db.query(Log.log_date).filter(Log.goal_id == goal.id).distinct()]
     db.delete(goal)
+    db.flush()
+    refresh_daily_rollup(db, user_id, logged_days)
     db.commit()
-    
-    return None
+    bump_data_version(user_id, [goal_id])
@@ -1,77 +1,212 @@
 """
 Роутер для работы с логами прогресса
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List
+from sqlalchemy import and_, or_, case, func
+from typing import List, Optional, Tuple
 from datetime import date
+import base64
 
-from database import get_db
+from database import DbSession, get_db, get_read_db, dialect_insert
+from cache import bump_data_version
+from routers.auth import CurrentUser, get_current_user
+from aggregates import apply_log_delta, apply_progress_deltas, collect_log_deltas, refresh_daily_rollup
 from models import Log, Goal, Subgoal
-from schemas import LogCreate, LogUpdate, LogResponse
+from schemas import LogCreate, LogUpdate, LogResponse, LogBatchCreate, LogBatchResponse
 
 router = APIRouter(prefix="/logs", tags=["logs"])
 
 
+def _log_upsert_stmt(db: Session, with_subgoal: bool):
+    """
+    INSERT ... ON CONFLICT DO UPDATE для логов: при совпадении
+    goal_id + subgoal_id + date минуты и количество суммируются, заметки склеиваются.
+    """
+    stmt = dialect_insert(db)(Log)
+    excluded = stmt.excluded
+
+    if with_subgoal:
+        conflict = {"index_elements": ["goal_id", "subgoal_id", "log_date"]}
+    else:
+        conflict = {
+            "index_elements": ["goal_id", "log_date"],
+            "index_where": Log.subgoal_id.is_(None)
+        }
+
+    return stmt.on_conflict_do_update(
+        **conflict,
+        set_={
+            "minutes_spent": Log.minutes_spent + excluded.minutes_spent,
+            "count_done": Log.count_done + excluded.count_done,
+            "note": case(
+                (excluded.note.is_(None), Log.note),
+                (func.coalesce(Log.note, "") == "", excluded.note),
+                else_=Log.note + " | " + excluded.note
+            )
+        }
+    )
+
+
 @router.post("/", response_model=LogResponse, status_code=201)
-def create_or_update_log(log_data: LogCreate, db: Session = Depends(get_db)):
+async def create_or_update_log(
+    log_data: LogCreate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
     """Создает лог или обновляет существующий (upsert по goal_id + subgoal_id + date)."""
-    goal = db.query(Goal).filter(Goal.id == log_data.goal_id).first()
-    if not goal:
+    return await db.run_sync(_create_or_update_log, log_data, current_user.id)
+
+
+def _create_or_update_log(db: Session, log_data: LogCreate, user_id: str) -> Log:
+    found = db.query(Goal.user_id, Subgoal.id).outerjoin(
+        Subgoal,
+        and_(Subgoal.goal_id == Goal.id, Subgoal.id == log_data.subgoal_id)
+    ).filter(Goal.id == log_data.goal_id, Goal.user_id == user_id).first()
+    if not found:
         raise HTTPException(status_code=404, detail="Цель не найдена")
     
-    if log_data.subgoal_id:
-        subgoal = db.query(Subgoal).filter(Subgoal.id == log_data.subgoal_id).first()
-        if not subgoal or subgoal.goal_id != log_data.goal_id:
-            raise HTTPException(status_code=404, detail="Подзадача не найдена")
-    
-    filters = [
-        Log.goal_id == log_data.goal_id,
-        Log.log_date == log_data.log_date
-    ]
-    if log_data.subgoal_id:
-        filters.append(Log.subgoal_id == log_data.subgoal_id)
-    else:
-        filters.append(Log.subgoal_id.is_(None))
-    
-    existing_log = db.query(Log).filter(and_(*filters)).first()
-    
-    if existing_log:
-        existing_log.minutes_spent += log_data.minutes_spent
-        existing_log.count_done += log_data.count_done
-        if log_data.note:
-            if existing_log.note:
-                existing_log.note += f" | {log_data.note}"
-            else:
-                existing_log.note = log_data.note
-        db.commit()
-        db.refresh(existing_log)
-        return existing_log
-    else:
-        new_log = Log(
-            goal_id=log_data.goal_id,
-            subgoal_id=log_data.subgoal_id,
-            log_date=log_data.log_date,
-            minutes_spent=log_data.minutes_spent,
-            count_done=log_data.count_done,
-            note=log_data.note
-        )
-        db.add(new_log)
-        db.commit()
-        db.refresh(new_log)
-        return new_log
+    _, subgoal_id = found
+    if log_data.subgoal_id and subgoal_id is None:
+        raise HTTPException(status_code=404, detail="Подзадача не найдена")
+    
+    stmt = _log_upsert_stmt(db, with_subgoal=log_data.subgoal_id is not None).values(
+        goal_id=log_data.goal_id,
+        subgoal_id=log_data.subgoal_id,
+        log_date=log_data.log_date,
+        minutes_spent=log_data.minutes_spent,
+        count_done=log_data.count_done,
+        note=log_data.note or None
+    ).returning(Log)
+    
+    log = db.scalars(stmt, execution_options={"populate_existing": True}).one()
+    apply_log_delta(db, log_data.goal_id, log_data.subgoal_id, log_data.minutes_spent, log_data.count_done)
+    refresh_daily_rollup(db, user_id, [log_data.log_date])
+    db.commit()
+    bump_data_version(user_id, [log_data.goal_id])
+    return log
 
 
-@router.get("/", response_model=List[LogResponse])
-def get_logs(
-    goal_id: str = Query(None, description="Фильтр по цели"),
-    date_from: date = Query(None, description="Начальная дата"),
-    date_to: date = Query(None, description="Конечная дата"),
-    db: Session = Depends(get_db)
+def _chunks(items: list, size: int = 500):
+    """Делит список на части, чтобы не упираться в лимит параметров в IN (...)."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+@router.post("/batch", response_model=LogBatchResponse)
+async def create_logs_batch(
+    batch: LogBatchCreate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
 ):
-    """Возвращает список логов с фильтрацией по цели и периоду."""
-    query = db.query(Log)
+    """
+    Массовая загрузка логов (импорт истории, офлайн-клиенты).
+    Дубли по goal_id + subgoal_id + date сливаются до записи,
+    всё пишется одной транзакцией через upsert.
+    """
+    return await db.run_sync(_create_logs_batch, batch, current_user.id)
+
+
+def _create_logs_batch(db: Session, batch: LogBatchCreate, user_id: str) -> dict:
+    goal_ids = list({item.goal_id for item in batch.items})
+    subgoal_ids = list({item.subgoal_id for item in batch.items if item.subgoal_id})
+    
+    owned_goals = set()
+    for chunk in _chunks(goal_ids):
+        owned_goals.update(
+            goal_id for (goal_id,) in db.query(Goal.id).filter(
+                Goal.id.in_(chunk), Goal.user_id == user_id
+            )
+        )
+    
+    subgoal_owner = {}
+    for chunk in _chunks(subgoal_ids):
+        subgoal_owner.update(
+            db.query(Subgoal.id, Subgoal.goal_id).filter(Subgoal.id.in_(chunk)).all()
+        )
+    
+    merged = {}
+    item_keys = []
+    errors = []
+    for index, item in enumerate(batch.items):
+        if item.goal_id not in owned_goals:
+            errors.append({"index": index, "detail": "Цель не найдена"})
+            item_keys.append(None)
+            continue
+        if item.subgoal_id and subgoal_owner.get(item.subgoal_id) != item.goal_id:
+            errors.append({"index": index, "detail": "Подзадача не найдена"})
+            item_keys.append(None)
+            continue
+        
+        key = (item.goal_id, item.subgoal_id, item.log_date)
+        row = merged.get(key)
+        if row is None:
+            row = merged[key] = {
+                "goal_id": item.goal_id,
+                "subgoal_id": item.subgoal_id,
+                "log_date": item.log_date,
+                "minutes_spent": 0,
+                "count_done": 0,
+                "note": None
+            }
+        row["minutes_spent"] += item.minutes_spent
+        row["count_done"] += item.count_done
+        if item.note:
+            row["note"] = f"{row['note']} | {item.note}" if row["note"] else item.note
+        item_keys.append(key)
+    
+    written_ids = {}
+    for with_subgoal in (False, True):
+        rows = [row for row in merged.values() if (row["subgoal_id"] is not None) == with_subgoal]
+        if not rows:
+            continue
+        # Строки сопоставляются по ключу, а не по порядку: с sort_by_parameter_order
+        # SQLAlchemy выполнял upsert отдельным запросом на каждую строку
+        stmt = _log_upsert_stmt(db, with_subgoal).returning(
+            Log.id, Log.goal_id, Log.subgoal_id, Log.log_date
+        )
+        for log_id, goal_id, subgoal_id, log_date in db.execute(stmt, rows):
+            written_ids[(goal_id, subgoal_id, log_date)] = log_id
+    
+    apply_progress_deltas(db, *collect_log_deltas(merged.values()))
+    refresh_daily_rollup(db, user_id, [row["log_date"] for row in merged.values()])
+    db.commit()
+    bump_data_version(user_id, {row["goal_id"] for row in merged.values()})
+    
+    return {
+        "written": len(written_ids),
+        "ids": [written_ids.get(key) if key else None for key in item_keys],
+        "errors": errors
+    }
+
+
+def _encode_cursor(log_date: date, log_id: str) -> str:
+    """Курсор пагинации: позиция последней отданной записи (log_date, id)."""
+    raw = f"{log_date.isoformat()}|{log_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[date, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        log_date, log_id = raw.split("|", 1)
+        return date.fromisoformat(log_date), log_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def _fetch_logs_page(
+    db: Session,
+    user_id: str,
+    after: Optional[Tuple[date, str]],
+    limit: int,
+    goal_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+) -> List[Log]:
+    """Страница логов пользователя от новых к старым, начиная после ключа after."""
+    query = db.query(Log).join(Goal, Log.goal_id == Goal.id).filter(Goal.user_id == user_id)
     
     if goal_id:
         query = query.filter(Log.goal_id == goal_id)
@@ -82,14 +217,80 @@ def get_logs(
     if date_to:
         query = query.filter(Log.log_date <= date_to)
     
-    logs = query.order_by(Log.log_date.desc()).all()
+    if after:
+        after_date, after_id = after
+        query = query.filter(or_(
+            Log.log_date < after_date,
+            and_(Log.log_date == after_date, Log.id < after_id)
+        ))
+    
+    return query.order_by(Log.log_date.desc(), Log.id.desc()).limit(limit).all()
+
+
+STREAM_PAGE_SIZE = 1000
+
+
+async def _iter_ndjson(db: DbSession, user_id: str, after: Optional[Tuple[date, str]], filters: dict):
+    """
+    Отдаёт логи потоком NDJSON, читая их страницами по ключу (log_date, id),
+    чтобы не держать весь список в памяти и не занимать соединение на весь поток.
+    """
+    while True:
+        logs = await db.run_sync(_fetch_logs_page, user_id, after, STREAM_PAGE_SIZE, **filters)
+        if logs:
+            yield "".join(LogResponse.model_validate(log).model_dump_json() + "\n" for log in logs)
+        if len(logs) < STREAM_PAGE_SIZE:
+            break
+        after = (logs[-1].log_date, logs[-1].id)
+
+
+@router.get("/", response_model=List[LogResponse])
+async def get_logs(
+    response: Response,
+    goal_id: str = Query(None, description="Фильтр по цели"),
+    date_from: date = Query(None, description="Начальная дата"),
+    date_to: date = Query(None, description="Конечная дата"),
+    cursor: str = Query(None, description="Курсор из заголовка X-Next-Cursor предыдущей страницы"),
+    limit: int = Query(500, ge=1, le=5000, description="Размер страницы"),
+    stream: bool = Query(False, description="Отдать все записи потоком NDJSON"),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_read_db)
+):
+    """
+    Возвращает логи текущего пользователя с фильтрацией по цели и периоду, от новых к старым.
+    Постраничный вывод по ключу (log_date, id): курсор следующей страницы
+    приходит в заголовке X-Next-Cursor. С stream=true все записи после
+    курсора отдаются потоком NDJSON без лимита.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    filters = {"goal_id": goal_id, "date_from": date_from, "date_to": date_to}
+    
+    if stream:
+        return StreamingResponse(
+            _iter_ndjson(db, current_user.id, after, filters), media_type="application/x-ndjson"
+        )
+    
+    logs = await db.run_sync(_fetch_logs_page, current_user.id, after, limit + 1, **filters)
+    if len(logs) > limit:
+        logs = logs[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(logs[-1].log_date, logs[-1].id)
     return logs
 
 
 @router.get("/{log_id}", response_model=LogResponse)
-def get_log(log_id: str, db: Session = Depends(get_db)):
+async def get_log(
+    log_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_read_db)
+):
     """Возвращает один лог по ID."""
-    log = db.query(Log).filter(Log.id == log_id).first()
+    return await db.run_sync(_get_log, log_id, current_user.id)
+
+
+def _get_log(db: Session, log_id: str, user_id: str) -> Log:
+    log = db.query(Log).join(Goal, Log.goal_id == Goal.id).filter(
+        Log.id == log_id, Goal.user_id == user_id
+    ).first()
     if not log:
         raise HTTPException(status_code=404, detail="Лог не найден")
     
@@ -97,30 +298,61 @@ def get_log(log_id: str, db: Session = Depends(get_db)):
 
 
 @router.put("/{log_id}", response_model=LogResponse)
-def update_log(log_id: str, log_data: LogUpdate, db: Session = Depends(get_db)):
+async def update_log(
+    log_id: str,
+    log_data: LogUpdate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
     """Обновляет лог (частичное обновление)."""
-    log = db.query(Log).filter(Log.id == log_id).first()
+    return await db.run_sync(_update_log, log_id, log_data, current_user.id)
+
+
+def _update_log(db: Session, log_id: str, log_data: LogUpdate, user_id: str) -> Log:
+    log = db.query(Log).join(Goal).filter(Log.id == log_id, Goal.user_id == user_id).first()
     if not log:
         raise HTTPException(status_code=404, detail="Лог не найден")
     
+    old_minutes, old_count = log.minutes_spent or 0, log.count_done or 0
+    
     update_data = log_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(log, field, value)
     
+    apply_log_delta(
+        db, log.goal_id, log.subgoal_id,
+        (log.minutes_spent or 0) - old_minutes,
+        (log.count_done or 0) - old_count
+    )
+    db.flush()
+    refresh_daily_rollup(db, user_id, [log.log_date])
     db.commit()
+    bump_data_version(user_id, [log.goal_id])
     db.refresh(log)
     
     return log
 
 
 @router.delete("/{log_id}", status_code=204)
-def delete_log(log_id: str, db: Session = Depends(get_db)):
+async def delete_log(
+    log_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
     """Удаляет лог."""
-    log = db.query(Log).filter(Log.id == log_id).first()
+    await db.run_sync(_delete_log, log_id, current_user.id)
+    return None
+
+
+def _delete_log(db: Session, log_id: str, user_id: str) -> None:
+    log = db.query(Log).join(Goal).filter(Log.id == log_id, Goal.user_id == user_id).first()
     if not log:
         raise HTTPException(status_code=404, detail="Лог не найден")
+    goal_id = log.goal_id
     
+    apply_log_delta(db, log.goal_id, log.subgoal_id, -(log.minutes_spent or 0), -(log.count_done or 0))
     db.delete(log)
+    db.flush()
+    refresh_daily_rollup(db, user_id, [log.log_date])
     db.commit()
-    
-    return None
+    bump_data_version(user_id, [goal_id])
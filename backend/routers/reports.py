@@ -1,17 +1,20 @@
 """
 Роутер для отчётов и статистики
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Optional
 from datetime import date
-from database import get_db
-from models import User, Goal, Log
+import numpy as np
+from database import DbSession, get_read_db
+from models import Goal, DailyRollup
 from schemas import (
-    GoalProgressResponse, OverallSummary, MonthReport, DailyActivity
+    GoalResponse, GoalProgressResponse, OverallSummary, MonthReport
 )
-from routers.auth import get_current_user
-from progress import calculate_progress_metrics
+from routers.auth import CurrentUser, get_current_user
+from progress import calculate_progress_metrics_from_totals, calculate_progress_metrics_batch
+from aggregates import fetch_goals_with_totals
+from cache import report_cache, get_data_version, user_etag, etag_response
 
 router = APIRouter(
     prefix="/reports",
@@ -19,68 +22,116 @@ router = APIRouter(
 )
 
 
+def _goal_progress(db: Session, goal_id: str, user_id: str, today: date) -> Optional[dict]:
+    """Цель пользователя с метриками прогресса или None, если цели нет."""
+    goal = db.query(Goal).filter(Goal.id == goal_id, Goal.user_id == user_id).first()
+    if not goal:
+        return None
+    
+    metrics = calculate_progress_metrics_from_totals(goal, goal.total_minutes, goal.total_count, today)
+    return {
+        "goal": GoalResponse.model_validate(goal).model_dump(),
+        "metrics": metrics
+    }
+
+
 @router.get("/goal/{goal_id}", response_model=GoalProgressResponse)
-def get_goal_progress(
+async def get_goal_progress(
     goal_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_read_db)
 ):
     """Возвращает метрики прогресса по конкретной цели."""
-    goal = db.query(Goal).filter(
-        Goal.id == goal_id, Goal.user_id == current_user.id
-    ).first()
-    if not goal:
-        raise HTTPException(status_code=404, detail="Goal not found")
+    not_modified = etag_response(request, response, user_etag(current_user.id))
+    if not_modified:
+        return not_modified
     
-    logs = db.query(Log).filter(Log.goal_id == goal_id).all()
-    metrics = calculate_progress_metrics(goal, logs)
+    today = date.today()
+    cache_key = ("goal", current_user.id, get_data_version(current_user.id), today, goal_id)
+    cached = report_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
-    return {
-        "goal": goal,
-        "metrics": metrics
-    }
+    result = await db.run_sync(_goal_progress, goal_id, current_user.id, today)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    
+    report_cache.set(cache_key, result)
+    return result
 
 @router.get("/summary", response_model=OverallSummary)
-def get_overall_summary(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_overall_summary(
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_read_db)
 ):
     """Возвращает общую статистику по всем целям пользователя."""
-    goals = db.query(Goal).filter(Goal.user_id == current_user.id).all()
+    not_modified = etag_response(request, response, user_etag(current_user.id))
+    if not_modified:
+        return not_modified
+    
+    today = date.today()
+    cache_key = ("summary", current_user.id, get_data_version(current_user.id), today)
+    cached = report_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    goals = await db.run_sync(fetch_goals_with_totals, current_user.id)
     
     if not goals:
-        return {
+        result = {
             "total_goals": 0,
             "on_track": 0,
             "at_risk": 0,
             "behind": 0,
             "total_percent": 0.0
         }
-        
-    statuses = {"on_track": 0, "at_risk": 0, "behind": 0}
-    total_percent = 0.0
+        report_cache.set(cache_key, result)
+        return result
     
-    for goal in goals:
-        logs = db.query(Log).filter(Log.goal_id == goal.id).all()
-        metrics = calculate_progress_metrics(goal, logs)
-        if metrics["status"] in statuses:
-            statuses[metrics["status"]] += 1
-        total_percent += metrics["percent"]
+    metrics = calculate_progress_metrics_batch(
+        goals,
+        total_minutes=[goal.total_minutes for goal in goals],
+        total_count=[goal.total_count for goal in goals],
+        current_date=today
+    )
+    statuses = metrics["status"]
         
-    return {
+    result = {
         "total_goals": len(goals),
-        "on_track": statuses["on_track"],
-        "at_risk": statuses["at_risk"],
-        "behind": statuses["behind"],
-        "total_percent": round(total_percent / len(goals), 1)
+        "on_track": int(np.count_nonzero(statuses == "on_track")),
+        "at_risk": int(np.count_nonzero(statuses == "at_risk")),
+        "behind": int(np.count_nonzero(statuses == "behind")),
+        "total_percent": round(float(metrics["percent"].sum()) / len(goals), 1)
     }
+    report_cache.set(cache_key, result)
+    return result
+
+def _fetch_month_rollup(db: Session, user_id: str, start_date: date, end_date: date) -> list:
+    """Подневные итоги пользователя за период (daily_rollup уже посчитан при записи логов)."""
+    return db.query(
+        DailyRollup.day,
+        DailyRollup.minutes,
+        DailyRollup.count,
+        DailyRollup.goals_active
+    ).filter(
+        DailyRollup.user_id == user_id,
+        DailyRollup.day >= start_date,
+        DailyRollup.day < end_date
+    ).order_by(DailyRollup.day).all()
+
 
 @router.get("/month/{year}/{month}", response_model=MonthReport)
-def get_month_report(
+async def get_month_report(
     year: int,
     month: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: DbSession = Depends(get_read_db)
 ):
     """Возвращает подневную активность за указанный месяц."""
     try:
@@ -91,35 +142,30 @@ def get_month_report(
             end_date = date(year, month + 1, 1)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date")
-        
-    logs = db.query(Log).join(Goal).filter(
-        Goal.user_id == current_user.id,
-        Log.log_date >= start_date,
-        Log.log_date < end_date
-    ).all()
     
-    daily_stats = {}
+    not_modified = etag_response(request, response, user_etag(current_user.id))
+    if not_modified:
+        return not_modified
     
-    for log in logs:
-        d = log.log_date
-        if d not in daily_stats:
-            daily_stats[d] = {"hours": 0.0, "count": 0, "goals": set()}
-            
-        daily_stats[d]["hours"] += log.minutes_spent / 60.0
-        daily_stats[d]["count"] += log.count_done
-        daily_stats[d]["goals"].add(log.goal_id)
+    cache_key = ("month", current_user.id, get_data_version(current_user.id), year, month)
+    cached = report_cache.get(cache_key)
+    if cached is not None:
+        return cached
         
+    rows = await db.run_sync(_fetch_month_rollup, current_user.id, start_date, end_date)
+    
     result_days = []
-    for d in sorted(daily_stats.keys()):
-        stats = daily_stats[d]
+    for d, minutes, count, goals_active in rows:
         result_days.append({
             "date": d,
-            "total_hours": round(stats["hours"], 2),
-            "total_count": stats["count"],
-            "goals_active": len(stats["goals"])
+            "total_hours": round(minutes / 60.0, 2),
+            "total_count": count,
+            "goals_active": goals_active
         })
         
-    return {
+    result = {
         "month": f"{year}-{month:02d}",
         "days": result_days
     }
+    report_cache.set(cache_key, result)
+    return result
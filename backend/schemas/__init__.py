@@ -1,16 +1,18 @@
 from .schemas import (
-    UserCreate, UserResponse,
+    UserCreate, UserResponse, AuthResponse,
     GoalCreate, GoalUpdate, GoalResponse,
     LogCreate, LogUpdate, LogResponse,
+    LogBatchCreate, LogBatchResponse,
     SubgoalCreate, SubgoalRead,
     GoalProgressResponse, OverallSummary, MonthReport, DailyActivity,
     AIPlanRequest, AIPlanResponse
 )
 
 __all__ = [
-    "UserCreate", "UserResponse",
+    "UserCreate", "UserResponse", "AuthResponse",
     "GoalCreate", "GoalUpdate", "GoalResponse",
     "LogCreate", "LogUpdate", "LogResponse",
+    "LogBatchCreate", "LogBatchResponse",
     "SubgoalCreate", "SubgoalRead",
     "GoalProgressResponse", "OverallSummary", "MonthReport", "DailyActivity",
     "AIPlanRequest", "AIPlanResponse"
@@ -22,6 +22,10 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class AuthResponse(UserResponse):
+    token: str
+
+
 # Goal schemas
 class SubgoalCreate(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
@@ -108,6 +112,21 @@ class LogResponse(LogBase):
         from_attributes = True
 
 
+class LogBatchCreate(BaseModel):
+    items: List[LogCreate] = Field(..., min_length=1, max_length=10000)
+
+
+class LogBatchError(BaseModel):
+    index: int
+    detail: str
+
+
+class LogBatchResponse(BaseModel):
+    written: int
+    ids: List[Optional[str]]
+    errors: List[LogBatchError] = []
+
+
 # Report schemas
 class ProgressMetrics(BaseModel):
     actual: float
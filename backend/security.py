@@ -0,0 +1,75 @@
+"""
+Подписанные токены сессии (HMAC-SHA256).
+
+Токен несёт id пользователя, часовой пояс и срок действия и проверяется
+только вычислениями, без обращения к БД:
+    base64url(JSON) + "." + base64url(HMAC(secret, payload))
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from typing import Optional
+
+from config import get_settings
+
+settings = get_settings()
+
+# Без SECRET_KEY ключ случайный на каждый процесс: токены не переживают
+# перезапуск и не подходят для нескольких воркеров. Годится только для
+# локальной разработки; docker-compose без SECRET_KEY не запускается.
+if not settings.secret_key:
+    logging.getLogger("goalpace.security").warning(
+        "SECRET_KEY не задан: используется случайный ключ процесса, "
+        "сессии сбросятся при перезапуске и не будут работать с несколькими воркерами"
+    )
+_secret = (settings.secret_key or secrets.token_hex(32)).encode()
+
+
+class InvalidToken(ValueError):
+    """Токен повреждён, подделан или просрочен."""
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _sign(body: str) -> str:
+    return _b64encode(hmac.new(_secret, body.encode(), hashlib.sha256).digest())
+
+
+def create_token(user_id: str, tz: str, ttl: Optional[int] = None) -> str:
+    """Выпускает токен для пользователя; ttl в секундах (по умолчанию из настроек)."""
+    payload = {
+        "sub": user_id,
+        "tz": tz,
+        "exp": int(time.time()) + (settings.token_ttl if ttl is None else ttl)
+    }
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    return f"{body}.{_sign(body)}"
+
+
+def verify_token(token: str) -> dict:
+    """Проверяет подпись и срок действия, возвращает содержимое токена."""
+    body, _, signature = token.partition(".")
+    # Сравнение байтов: str с не-ASCII символами compare_digest не принимает
+    if not signature or not hmac.compare_digest(signature.encode(), _sign(body).encode()):
+        raise InvalidToken("Неверная подпись")
+
+    try:
+        payload = json.loads(_b64decode(body))
+        user_id, tz, expires_at = payload["sub"], payload["tz"], payload["exp"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidToken("Некорректный токен")
+
+    if expires_at < time.time():
+        raise InvalidToken("Срок действия токена истёк")
+
+    return {"sub": user_id, "tz": tz, "exp": expires_at}
@@ -1,12 +1,31 @@
+"""
+Заполнение БД тестовыми данными.
+
+    python seed.py              — демо-пользователь demo@example.com с тремя целями
+    python seed.py --generate   — синтетический набор для оценки нагрузки:
+        --users, --goals (на пользователя), --subgoals (на цель), --days (история),
+        --density (вероятность лога на подзадачу в день), --seed, --chunk
+
+Генератор пишет через Core executemany порциями по --chunk логов, каждая
+порция — отдельная транзакция. Данные (включая uuid) детерминированы seed и
+--end-date. Счётчики целей/подзадач и daily_rollup считаются при генерации.
+БД берётся из DATABASE_URL (SQLite или PostgreSQL), схема должна быть создана миграциями.
+"""
+import argparse
 import sys
 import os
 import random
-from datetime import date, timedelta
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import insert, select
+
 from database import SessionLocal, engine, Base
-from models import User, Goal, Log, GoalType, GoalUnit
+from models import User, Goal, Subgoal, Log, DailyRollup, GoalType, GoalUnit
+from aggregates import rebuild_progress_totals, rebuild_daily_rollup
 
 def seed_data():
     db = SessionLocal()
@@ -115,8 +134,166 @@ def seed_data():
             current_log_date += timedelta(days=1)
         
     db.commit()
+
+    # Логи добавлены напрямую, поэтому счётчики и сводку пересчитываем из них
+    rebuild_progress_totals(db, [goal.id for goal in created_goals])
+    rebuild_daily_rollup(db, [user.id])
+    db.commit()
     print("Seeding completed successfully!")
     db.close()
 
+
+# Порядок вставки при сбросе порции: сначала родительские таблицы (внешние ключи)
+_TABLES = (User.__table__, Goal.__table__, Subgoal.__table__, Log.__table__, DailyRollup.__table__)
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _generate_user(rng: random.Random, index: int, seed: int, goals_per_user: int,
+                   subgoals_per_goal: int, start: date, end_date: date, density: float,
+                   created_at: datetime, pending: dict) -> None:
+    """Строки одного пользователя (цели, подзадачи, логи, сводка) в pending по таблицам."""
+    user_id = _uuid(rng)
+    pending[User.__table__].append({
+        "id": user_id, "email": f"seed-{seed}-{index}@example.com",
+        "tz": "Europe/Moscow", "created_at": created_at
+    })
+
+    history_days = (end_date - start).days + 1
+    rollup = {}  # день -> [минуты, количество, цели]
+    for g in range(goals_per_user):
+        goal_id = _uuid(rng)
+        is_time = rng.random() < 0.6
+        length = rng.randint(min(30, history_days), history_days)
+        period_start = start + timedelta(days=rng.randint(0, history_days - length))
+        period_end = period_start + timedelta(days=length - 1 + rng.randint(0, 30))
+        logged_days = (min(period_end, end_date) - period_start).days + 1
+
+        goal_minutes = goal_count = 0
+        subgoal_rows = []
+        for position in range(max(subgoals_per_goal, 1)):
+            subgoal_id = _uuid(rng) if subgoals_per_goal else None
+            sub_minutes = sub_count = 0
+            for day in range(logged_days):
+                if rng.random() >= density:
+                    continue
+                log_date = period_start + timedelta(days=day)
+                minutes = rng.randint(10, 180) if is_time else 0
+                count = 0 if is_time else rng.randint(1, 5)
+                pending[Log.__table__].append({
+                    "id": _uuid(rng), "goal_id": goal_id, "subgoal_id": subgoal_id,
+                    "log_date": log_date, "minutes_spent": minutes, "count_done": count,
+                    "note": None, "created_at": created_at
+                })
+                sub_minutes += minutes
+                sub_count += count
+                totals = rollup.setdefault(log_date, [0, 0, set()])
+                totals[0] += minutes
+                totals[1] += count
+                totals[2].add(goal_id)
+
+            goal_minutes += sub_minutes
+            goal_count += sub_count
+            if subgoal_id:
+                subgoal_rows.append({
+                    "id": subgoal_id, "goal_id": goal_id, "title": f"Подзадача {position + 1}",
+                    "target": 20.0, "position": position,
+                    "total_minutes": sub_minutes, "total_count": sub_count
+                })
+
+        pending[Goal.__table__].append({
+            "id": goal_id, "user_id": user_id, "title": f"Цель {g + 1}",
+            "type": GoalType.TIME if is_time else GoalType.COUNT,
+            "target": 20.0 * max(subgoals_per_goal, 1),
+            "unit": GoalUnit.HOURS if is_time else GoalUnit.COUNT,
+            "period_start": period_start, "period_end": period_end,
+            "priority": rng.randint(1, 3), "notes": None, "created_at": created_at,
+            "total_minutes": goal_minutes, "total_count": goal_count
+        })
+        pending[Subgoal.__table__].extend(subgoal_rows)
+
+    pending[DailyRollup.__table__].extend(
+        {"user_id": user_id, "day": day, "minutes": minutes, "count": count, "goals_active": len(goals)}
+        for day, (minutes, count, goals) in rollup.items()
+    )
+
+
+def _flush(target_engine, pending: dict, chunk_size: int) -> None:
+    """Записывает накопленные строки одной транзакцией (executemany порциями)."""
+    with target_engine.begin() as conn:
+        for table in _TABLES:
+            rows = pending[table]
+            for i in range(0, len(rows), chunk_size):
+                conn.execute(insert(table), rows[i:i + chunk_size])
+            rows.clear()
+
+
+def generate_dataset(target_engine=engine, users: int = 100, goals_per_user: int = 5,
+                     subgoals_per_goal: int = 3, days: int = 365, density: float = 0.6,
+                     seed: int = 42, chunk_size: int = 50000, end_date: date = None) -> dict:
+    """
+    Генерирует синтетический набор данных и возвращает число строк по таблицам.
+    Повторный запуск с тем же seed и end_date дал бы те же id, поэтому
+    при уже сгенерированном наборе выбрасывается ValueError.
+    """
+    end_date = end_date or date.today()
+    start = end_date - timedelta(days=days - 1)
+    created_at = datetime.combine(start, datetime.min.time(), tzinfo=timezone.utc)
+
+    first_user_id = _uuid(random.Random(seed))
+    with target_engine.connect() as conn:
+        if conn.execute(select(User.id).where(User.id == first_user_id)).first():
+            raise ValueError(f"Набор с seed={seed} уже есть в БД; выберите другой seed")
+
+    rng = random.Random(seed)
+    pending = {table: [] for table in _TABLES}
+    written = {table.name: 0 for table in _TABLES}
+    started = time.perf_counter()
+
+    for index in range(users):
+        _generate_user(rng, index, seed, goals_per_user, subgoals_per_goal,
+                       start, end_date, density, created_at, pending)
+        if len(pending[Log.__table__]) >= chunk_size or index == users - 1:
+            for table in _TABLES:
+                written[table.name] += len(pending[table])
+            _flush(target_engine, pending, chunk_size)
+            elapsed = time.perf_counter() - started
+            print(f"  пользователей {index + 1}/{users}, логов {written['logs']} "
+                  f"({written['logs'] / elapsed:,.0f} строк/с)")
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заполнение БД тестовыми данными")
+    parser.add_argument("--generate", action="store_true", help="Синтетический набор вместо демо-данных")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--goals", type=int, default=5, help="Целей на пользователя")
+    parser.add_argument("--subgoals", type=int, default=3, help="Подзадач на цель (0 — логи без подзадач)")
+    parser.add_argument("--days", type=int, default=365, help="Дней истории")
+    parser.add_argument("--density", type=float, default=0.6, help="Вероятность лога на подзадачу в день")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk", type=int, default=50000, help="Логов на транзакцию")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None, help="Последний день истории (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    if not args.generate:
+        seed_data()
+        return
+
+    print(f"Генерация: {args.users} пользователей x {args.goals} целей x {args.subgoals} подзадач, "
+          f"{args.days} дней, плотность {args.density}, seed {args.seed}")
+    started = time.perf_counter()
+    written = generate_dataset(
+        users=args.users, goals_per_user=args.goals, subgoals_per_goal=args.subgoals,
+        days=args.days, density=args.density, seed=args.seed, chunk_size=args.chunk,
+        end_date=args.end_date
+    )
+    print(f"Готово за {time.perf_counter() - started:.1f} с: "
+          + ", ".join(f"{name} {count}" for name, count in written.items()))
+
+
 if __name__ == "__main__":
-    seed_data()
+    main()
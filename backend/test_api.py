@@ -8,12 +8,15 @@ from datetime import date, timedelta
 
 BASE_URL = "http://localhost:8000"
 
+# Токен из /auth/demo уходит в заголовке Authorization всех запросов сессии
+session = requests.Session()
+
 
 def test_auth_demo():
     """Тест создания демо-пользователя"""
     print("Тест 1: POST /auth/demo")
 
-    response = requests.post(
+    response = session.post(
         f"{BASE_URL}/auth/demo",
         json={
             "email": "test@goalpace.com",
@@ -24,28 +27,30 @@ def test_auth_demo():
     assert response.status_code == 200
     data = response.json()
     assert "id" in data
+    assert "token" in data
     assert data["email"] == "test@goalpace.com"
     print(f"  Пользователь создан: {data['id']}")
 
-    response2 = requests.post(
+    response2 = session.post(
         f"{BASE_URL}/auth/demo",
         json={"email": "test@goalpace.com"}
     )
     assert response2.json()["id"] == data["id"]
     print("  Повторный вызов вернул того же пользователя")
 
+    session.headers["Authorization"] = f"Bearer {data['token']}"
     return data["id"]
 
 
-def test_create_goal(user_id):
+def test_create_goal():
     """Тест создания цели с подзадачами."""
     print("\nТест 2: POST /goals")
 
     today = date.today()
     end = today + timedelta(days=30)
 
-    response = requests.post(
-        f"{BASE_URL}/goals/?user_id={user_id}",
+    response = session.post(
+        f"{BASE_URL}/goals/",
         json={
             "title": "Изучить FastAPI",
             "type": "time",
@@ -74,14 +79,14 @@ def test_create_goal(user_id):
     return data["id"]
 
 
-def test_create_goal_validation(user_id):
+def test_create_goal_validation():
     """Тест валидации при создании цели."""
     print("\nТест 3: Валидация POST /goals")
 
     today = date.today()
 
-    response = requests.post(
-        f"{BASE_URL}/goals/?user_id={user_id}",
+    response = session.post(
+        f"{BASE_URL}/goals/",
         json={
             "title": "Тест",
             "type": "time",
@@ -96,7 +101,7 @@ def test_create_goal_validation(user_id):
     print("  Некорректные даты — 400")
 
     response = requests.post(
-        f"{BASE_URL}/goals/?user_id=nonexistent-id",
+        f"{BASE_URL}/goals/",
         json={
             "title": "Тест",
             "type": "time",
@@ -107,15 +112,15 @@ def test_create_goal_validation(user_id):
             "plan": [{"title": "Подзадача", "target": 10.0}]
         }
     )
-    assert response.status_code == 404
-    print("  Несуществующий пользователь — 404")
+    assert response.status_code == 401
+    print("  Запрос без токена — 401")
 
 
-def test_get_goals(user_id):
+def test_get_goals():
     """Тест получения списка целей."""
     print("\nТест 4: GET /goals")
 
-    response = requests.get(f"{BASE_URL}/goals/?user_id={user_id}")
+    response = session.get(f"{BASE_URL}/goals/")
 
     assert response.status_code == 200
     data = response.json()
@@ -128,7 +133,7 @@ def test_get_goal(goal_id):
     """Тест получения одной цели."""
     print("\nТест 5: GET /goals/{id}")
 
-    response = requests.get(f"{BASE_URL}/goals/{goal_id}")
+    response = session.get(f"{BASE_URL}/goals/{goal_id}")
 
     assert response.status_code == 200
     data = response.json()
@@ -136,7 +141,7 @@ def test_get_goal(goal_id):
     assert len(data["plan"]) == 3
     print(f"  Цель: {data['title']}, подзадач: {len(data['plan'])}")
 
-    response = requests.get(f"{BASE_URL}/goals/nonexistent-id")
+    response = session.get(f"{BASE_URL}/goals/nonexistent-id")
     assert response.status_code == 404
     print("  Несуществующая цель — 404")
 
@@ -145,10 +150,10 @@ def test_update_goal(goal_id):
     """Тест обновления цели и подзадач."""
     print("\nТест 6: PUT /goals/{id}")
 
-    current = requests.get(f"{BASE_URL}/goals/{goal_id}").json()
+    current = session.get(f"{BASE_URL}/goals/{goal_id}").json()
     subgoal_ids = [s["id"] for s in current["plan"]]
 
-    response = requests.put(
+    response = session.put(
         f"{BASE_URL}/goals/{goal_id}",
         json={
             "priority": 3,
@@ -175,10 +180,10 @@ def test_log_progress(goal_id):
     """Тест логирования прогресса."""
     print("\nТест 7: POST /logs")
 
-    goal = requests.get(f"{BASE_URL}/goals/{goal_id}").json()
+    goal = session.get(f"{BASE_URL}/goals/{goal_id}").json()
     subgoal_id = goal["plan"][0]["id"]
 
-    response = requests.post(
+    response = session.post(
         f"{BASE_URL}/logs/",
         json={
             "goal_id": goal_id,
@@ -193,7 +198,7 @@ def test_log_progress(goal_id):
     assert response.status_code == 201
     print("  Лог создан: 120 минут")
 
-    goal_updated = requests.get(f"{BASE_URL}/goals/{goal_id}").json()
+    goal_updated = session.get(f"{BASE_URL}/goals/{goal_id}").json()
     assert goal_updated["plan"][0]["current"] == 2.0
     print(f"  Прогресс подзадачи: {goal_updated['plan'][0]['current']} ч")
 
@@ -202,11 +207,11 @@ def test_delete_goal(goal_id):
     """Тест удаления цели."""
     print("\nТест 8: DELETE /goals/{id}")
 
-    response = requests.delete(f"{BASE_URL}/goals/{goal_id}")
+    response = session.delete(f"{BASE_URL}/goals/{goal_id}")
     assert response.status_code == 204
     print("  Цель удалена")
 
-    response = requests.get(f"{BASE_URL}/goals/{goal_id}")
+    response = session.get(f"{BASE_URL}/goals/{goal_id}")
     assert response.status_code == 404
     print("  Подтверждение: цель не найдена — 404")
 
@@ -217,10 +222,10 @@ def run_all_tests():
     print("=" * 50)
 
     try:
-        user_id = test_auth_demo()
-        goal_id = test_create_goal(user_id)
-        test_create_goal_validation(user_id)
-        test_get_goals(user_id)
+        test_auth_demo()
+        goal_id = test_create_goal()
+        test_create_goal_validation()
+        test_get_goals()
         test_get_goal(goal_id)
         test_update_goal(goal_id)
         test_log_progress(goal_id)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Тесты подписанных токенов и доступа к чужим данным.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from models import User
+from security import InvalidToken, create_token, verify_token
+from tests.helpers import make_test_client
+
+
+def test_token_roundtrip_and_tampering():
+    """Токен проверяется без БД; подделанный или просроченный отклоняется."""
+    print("Тест 1: Подпись токена")
+
+    token = create_token("user-1", "Europe/Moscow")
+    payload = verify_token(token)
+    assert payload["sub"] == "user-1" and payload["tz"] == "Europe/Moscow"
+
+    body, signature = token.split(".")
+    bad_tokens = [
+        body + "." + signature[:-1] + ("A" if signature[-1] != "A" else "B"),
+        create_token("user-2", "UTC").split(".")[0] + "." + signature,
+        create_token("user-1", "UTC", ttl=-1),
+        "garbage",
+        "abc.éé",
+    ]
+    for bad in bad_tokens:
+        try:
+            verify_token(bad)
+        except InvalidToken:
+            continue
+        raise AssertionError(f"Токен должен быть отклонён: {bad}")
+    print("  Тест пройден\n")
+
+
+def test_routes_require_token_and_owner():
+    """Без токена — 401, с чужим токеном цели и логи не видны (404)."""
+    print("Тест 2: Доступ к чужим данным")
+
+    client, _ = make_test_client()
+    owner = client.login("owner@example.com")
+    today = date.today()
+    goal = client.post("/goals/", json={
+        "title": "Своя цель", "type": "count", "target": 5.0, "unit": "count",
+        "period_start": today.isoformat(),
+        "period_end": (today + timedelta(days=7)).isoformat()
+    }).json()
+    log = client.post("/logs/", json={"goal_id": goal["id"], "log_date": today.isoformat(), "count_done": 1}).json()
+
+    client.token = None
+    for url in ("/goals/", f"/goals/{goal['id']}", "/logs/", "/reports/summary"):
+        assert client.get(url).status_code == 401, url
+    assert client.get("/goals/", headers={"Authorization": "Bearer forged.token"}).status_code == 401
+    assert client.get("/goals/", headers={"Authorization": "Bearer abc.éé".encode()}).status_code == 401
+
+    client.login("stranger@example.com")
+    assert client.get("/goals/").json() == []
+    assert client.get("/logs/").json() == []
+    assert client.get(f"/goals/{goal['id']}").status_code == 404
+    assert client.get(f"/logs/{log['id']}").status_code == 404
+    assert client.delete(f"/goals/{goal['id']}").status_code == 404
+    assert client.put(f"/logs/{log['id']}", json={"count_done": 10}).status_code == 404
+    assert client.post("/logs/", json={"goal_id": goal["id"], "log_date": today.isoformat()}).status_code == 404
+
+    client.token = owner["token"]
+    assert client.get(f"/goals/{goal['id']}").json()["plan"] == []
+    assert client.get(f"/logs/{log['id']}").json()["count_done"] == 1
+    print("  Тест пройден\n")
+
+
+def test_demo_login_get_or_create():
+    """Повторный вход по email возвращает того же пользователя без дублей и без записи в users."""
+    print("Тест 3: Get-or-create по email")
+
+    client, TestingSession = make_test_client()
+    first = client.login("same@example.com")
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(TestingSession.kw["bind"], "before_cursor_execute", listener)
+    try:
+        second = client.login("same@example.com")
+    finally:
+        event.remove(TestingSession.kw["bind"], "before_cursor_execute", listener)
+    assert not any("UPDATE" in statement.upper() for statement in statements), "Повторный вход не пишет строку"
+    anonymous = [client.login(), client.login()]
+
+    assert first["id"] == second["id"]
+    assert first["created_at"] == second["created_at"]
+    assert anonymous[0]["id"] != anonymous[1]["id"], "Без email каждый вход создаёт нового пользователя"
+
+    db = TestingSession()
+    try:
+        assert db.query(User).filter(User.email == "same@example.com").count() == 1
+    finally:
+        db.close()
+    print("  Тест пройден\n")
+
+
+def run_all_tests():
+    print("=" * 50)
+    print("Тесты авторизации")
+    print("=" * 50 + "\n")
+
+    test_token_roundtrip_and_tampering()
+    test_routes_require_token_and_owner()
+    test_demo_login_get_or_create()
+
+    print("=" * 50)
+    print("Все тесты авторизации пройдены успешно")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Тесты настроек соединений SQLite: прагмы, запись во время чтения (WAL)
+и чтения через реплику.
+"""
+import sqlite3
+from datetime import date, timedelta
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from config import get_settings
+from models import User
+from tests.helpers import make_test_client
+
+settings = get_settings()
+
+
+def test_sqlite_pragmas():
+    """Каждое соединение получает WAL, synchronous=NORMAL и ожидание блокировки."""
+    print("Тест 1: Прагмы SQLite")
+
+    _, TestingSession = make_test_client()
+    engine = TestingSession.kw["bind"]
+
+    with engine.connect() as conn:
+        journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+        synchronous = conn.execute(text("PRAGMA synchronous")).scalar()
+        busy_timeout = conn.execute(text("PRAGMA busy_timeout")).scalar()
+
+    print(f"  journal_mode={journal_mode}, synchronous={synchronous}, busy_timeout={busy_timeout}")
+    assert journal_mode == "wal"
+    assert synchronous == 1, "1 — NORMAL"
+    assert busy_timeout > 0
+    print("  Тест пройден\n")
+
+
+def test_write_during_read():
+    """Открытая транзакция чтения не мешает закоммитить запись (в WAL нет "database is locked")."""
+    print("Тест 2: Запись во время чтения")
+
+    _, TestingSession = make_test_client()
+    engine = TestingSession.kw["bind"]
+
+    reader = sqlite3.connect(engine.url.database, isolation_level=None)
+    writer = TestingSession()
+    try:
+        reader.execute("BEGIN")
+        assert reader.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+
+        # В режиме rollback-журнала коммит ждал бы окончания чтения и падал по busy_timeout
+        writer.execute(text("PRAGMA busy_timeout=100"))
+        writer.add(User(email="writer@example.com"))
+        writer.commit()
+
+        assert reader.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0, "Читатель видит свой снимок"
+        reader.execute("COMMIT")
+        assert reader.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 1
+    finally:
+        writer.close()
+        reader.close()
+    print("  Тест пройден\n")
+
+
+def test_reads_go_to_replica():
+    """GET-обработчики и отчёты читают из реплики (mode=ro), кроме окна сразу после записи пользователя."""
+    print("Тест 3: Чтение через реплику")
+
+    client, TestingSession = make_test_client(read_replica=True)
+    client.login()
+    today = date.today()
+    goal = client.post("/goals/", json={
+        "title": "Цель на реплике", "type": "count", "target": 10.0, "unit": "count",
+        "period_start": (today - timedelta(days=5)).isoformat(),
+        "period_end": (today + timedelta(days=5)).isoformat()
+    }).json()
+    log = client.post("/logs/", json={"goal_id": goal["id"], "log_date": today.isoformat(), "count_done": 3}).json()
+
+    engines = {"primary": TestingSession.kw["bind"], "replica": client.read_session.kw["bind"]}
+
+    def count_statements(urls):
+        statements = {"primary": 0, "replica": 0}
+        listeners = {
+            name: (lambda *args, name=name: statements.__setitem__(name, statements[name] + 1))
+            for name in engines
+        }
+        for name, engine in engines.items():
+            event.listen(engine, "before_cursor_execute", listeners[name])
+        try:
+            for url in urls:
+                assert client.get(url).status_code == 200, url
+        finally:
+            for name, engine in engines.items():
+                event.remove(engine, "before_cursor_execute", listeners[name])
+        return statements
+
+    read_urls = [
+        "/goals/", f"/goals/{goal['id']}", "/logs/", f"/logs/{log['id']}",
+        f"/reports/goal/{goal['id']}", "/reports/summary", f"/reports/month/{today.year}/{today.month}"
+    ]
+
+    # Сразу после записи чтения пользователя идут в основную БД (реплика может отставать)
+    statements = count_statements(read_urls)
+    print(f"  После записи: основная={statements['primary']}, реплика={statements['replica']}")
+    assert statements["replica"] == 0
+
+    window = settings.read_your_writes_seconds
+    settings.read_your_writes_seconds = 0
+    try:
+        statements = count_statements(read_urls)
+    finally:
+        settings.read_your_writes_seconds = window
+    print(f"  Без недавних записей: основная={statements['primary']}, реплика={statements['replica']}")
+    assert statements["primary"] == 0
+    assert statements["replica"] > 0
+
+    assert client.get(f"/reports/goal/{goal['id']}").json()["metrics"]["actual"] == 3.0, "Реплика видит записанный лог"
+
+    replica = client.read_session()
+    try:
+        replica.execute(text("DELETE FROM logs"))
+        raise AssertionError("Реплика должна отклонять запись")
+    except OperationalError as e:
+        print(f"  Запись в реплику отклонена: {e.orig}")
+    finally:
+        replica.close()
+    print("  Тест пройден\n")
+
+
+
+def test_async_session_mode():
+    """С DATABASE_ASYNC=true основные маршруты работают через AsyncSession (aiosqlite)."""
+    print("Тест 4: Асинхронный режим БД")
+
+    client, TestingSession = make_test_client(async_db=True)
+    statements = []
+    sync_engine = TestingSession.kw["bind"]
+    listener = lambda *args: statements.append(args)
+    event.listen(sync_engine, "before_cursor_execute", listener)
+    try:
+        client.login("async@example.com")
+        today = date.today()
+        response = client.post("/goals/", json={
+            "title": "Асинхронная цель", "type": "count", "target": 10.0, "unit": "count",
+            "period_start": (today - timedelta(days=5)).isoformat(),
+            "period_end": (today + timedelta(days=5)).isoformat(),
+            "plan": [{"title": "Подзадача", "target": 10.0}]
+        })
+        assert response.status_code == 201, response.text
+        goal = response.json()
+        subgoal_id = goal["plan"][0]["id"]
+
+        log = client.post("/logs/", json={
+            "goal_id": goal["id"], "subgoal_id": subgoal_id, "log_date": today.isoformat(), "count_done": 2
+        }).json()
+        batch = client.post("/logs/batch", json={"items": [
+            {"goal_id": goal["id"], "subgoal_id": subgoal_id,
+             "log_date": (today - timedelta(days=day)).isoformat(), "count_done": 1}
+            for day in range(1, 4)
+        ]})
+        assert batch.status_code == 200, batch.text
+        assert client.put(f"/logs/{log['id']}", json={"count_done": 4}).status_code == 200
+        assert client.put(f"/goals/{goal['id']}", json={"priority": 3}).status_code == 200
+
+        for url in [
+            "/goals/", f"/goals/{goal['id']}", "/logs/", f"/logs/{log['id']}",
+            f"/reports/goal/{goal['id']}", "/reports/summary", f"/reports/month/{today.year}/{today.month}"
+        ]:
+            assert client.get(url).status_code == 200, url
+        assert client.get(f"/reports/goal/{goal['id']}").json()["metrics"]["actual"] == 7.0
+
+        assert client.delete(f"/logs/{log['id']}").status_code == 204
+        assert client.delete(f"/goals/{goal['id']}").status_code == 204
+        assert client.get("/goals/").json() == []
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", listener)
+
+    assert statements == [], "Запросы должны идти через асинхронный движок"
+    print("  Тест пройден\n")
+
+if __name__ == "__main__":
+    test_sqlite_pragmas()
+    test_write_during_read()
+    test_reads_go_to_replica()
+    test_async_session_mode()
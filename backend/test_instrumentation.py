@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Тесты учёта SQL-запросов: заголовки Server-Timing / X-Query-Count,
+бюджеты запросов маршрутов и лог медленных запросов.
+"""
+import logging
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from instrumentation import QueryStats, _current_stats, logger, settings
+from tests.helpers import assert_max_queries, make_test_client
+
+
+def _create_goal(client, subgoals: int = 3):
+    today = date.today()
+    return client.post("/goals/", json={
+        "title": "Цель с бюджетом", "type": "time", "target": 10.0, "unit": "hours",
+        "period_start": (today - timedelta(days=5)).isoformat(),
+        "period_end": (today + timedelta(days=5)).isoformat(),
+        "plan": [{"title": f"Подзадача {i}", "target": 1.0} for i in range(subgoals)]
+    })
+
+
+def test_query_headers():
+    """Каждый ответ несёт число SQL-запросов и время в БД."""
+    print("Тест 1: Заголовки учёта запросов")
+
+    client, _ = make_test_client()
+    client.login()
+    response = client.get("/goals/")
+
+    print(f"  X-Query-Count={response.headers['X-Query-Count']}, Server-Timing={response.headers['Server-Timing']}")
+    assert int(response.headers["X-Query-Count"]) >= 1
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert "app;dur=" in response.headers["Server-Timing"]
+    assert client.get("/health").headers["X-Query-Count"] == "0"
+    print("  Тест пройден\n")
+
+
+def test_route_query_budgets():
+    """Число запросов не растёт с количеством целей, подзадач и логов (нет N+1)."""
+    print("Тест 2: Бюджеты SQL-запросов маршрутов")
+
+    client, _ = make_test_client()
+    client.login()
+    today = date.today()
+
+    goal = _create_goal(client).json()
+    for _ in range(5):
+        assert_max_queries(_create_goal(client, subgoals=6), 6)
+
+    log = client.post("/logs/", json={
+        "goal_id": goal["id"], "subgoal_id": goal["plan"][0]["id"],
+        "log_date": today.isoformat(), "minutes_spent": 30
+    })
+    assert_max_queries(log, 7)
+    log = log.json()
+
+    batch = client.post("/logs/batch", json={"items": [
+        {"goal_id": goal["id"], "log_date": (today - timedelta(days=i % 5)).isoformat(), "minutes_spent": 5}
+        for i in range(100)
+    ]})
+    assert_max_queries(batch, 8)
+
+    budgets = {
+        "/goals/": 1,
+        f"/goals/{goal['id']}": 1,
+        "/logs/": 1,
+        f"/logs/{log['id']}": 1,
+        f"/reports/goal/{goal['id']}": 1,
+        "/reports/summary": 1,
+        f"/reports/month/{today.year}/{today.month}": 1
+    }
+    for url, budget in budgets.items():
+        count = assert_max_queries(client.get(url), budget)
+        print(f"  GET {url}: {count}")
+
+    assert_max_queries(client.put(f"/goals/{goal['id']}", json={"title": "Новое название"}), 3)
+    assert_max_queries(client.put(f"/logs/{log['id']}", json={"minutes_spent": 40}), 8)
+    assert_max_queries(client.delete(f"/logs/{log['id']}"), 7)
+    print("  Тест пройден\n")
+
+
+def test_slow_request_logged():
+    """Запрос дольше SLOW_REQUEST_MS попадает в лог вместе с числом SQL-запросов."""
+    print("Тест 3: Лог медленных запросов")
+
+    client, _ = make_test_client()
+    client.login()
+
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger.addHandler(handler)
+    threshold = settings.slow_request_ms
+    settings.slow_request_ms = 1
+    try:
+        client.get("/reports/summary")
+    finally:
+        settings.slow_request_ms = threshold
+        logger.removeHandler(handler)
+
+    messages = [record.getMessage() for record in records]
+    print(f"  {messages}")
+    assert any("GET /reports/summary" in m and "SQL-запросов: 1" in m for m in messages)
+    print("  Тест пройден\n")
+
+
+
+def test_failed_query_counted():
+    """Упавший запрос учитывается и не оставляет следов на соединении из пула."""
+    print("Тест 4: Учёт упавшего запроса")
+
+    _, TestingSession = make_test_client()
+    engine = TestingSession.kw["bind"]
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+            conn.execute(text("INSERT INTO t (id) VALUES (1)"))
+            try:
+                conn.execute(text("INSERT INTO t (id) VALUES (1)"))
+                raise AssertionError("Ожидалось нарушение уникальности")
+            except IntegrityError:
+                pass
+            conn.execute(text("SELECT id FROM t"))
+            leftovers = dict(conn.info)
+    finally:
+        _current_stats.reset(token)
+
+    print(f"  Запросов: {stats.count}, в БД {stats.db_time * 1000:.2f} мс")
+    assert stats.count == 4
+    assert "query_start" not in leftovers, leftovers
+    print("  Тест пройден\n")
+
+if __name__ == "__main__":
+    test_query_headers()
+    test_route_query_budgets()
+    test_slow_request_logged()
+    test_failed_query_counted()
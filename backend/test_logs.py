@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Тесты эндпоинтов логов на временной базе (без запущенного сервера).
+"""
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy.dialects import postgresql
+
+from aggregates import _rollup_lock_stmt, rebuild_progress_totals, rebuild_daily_rollup, refresh_daily_rollup
+from models import Goal, Log, Subgoal, DailyRollup
+from tests.helpers import make_test_client
+
+
+def _create_user_and_goal(client, plan=None):
+    """Создаёт пользователя и цель по времени на месяц вокруг сегодняшней даты."""
+    user = client.login()
+    today = date.today()
+    goal = client.post(
+        "/goals/",
+        json={
+            "title": "Тестовая цель",
+            "type": "time",
+            "target": 20.0,
+            "unit": "hours",
+            "period_start": (today - timedelta(days=15)).isoformat(),
+            "period_end": (today + timedelta(days=15)).isoformat(),
+            "plan": plan or []
+        }
+    ).json()
+    return user, goal
+
+
+def test_log_upsert_merges_same_day():
+    """Повторный лог за тот же день суммируется в одну запись."""
+    print("Тест 1: Upsert лога")
+
+    client, _ = make_test_client()
+    _, goal = _create_user_and_goal(client, plan=[{"title": "Подзадача", "target": 20.0}])
+    subgoal_id = goal["plan"][0]["id"]
+    today = date.today().isoformat()
+
+    for subgoal in (None, subgoal_id):
+        first = client.post("/logs/", json={
+            "goal_id": goal["id"], "subgoal_id": subgoal, "log_date": today,
+            "minutes_spent": 30, "note": "утро"
+        })
+        second = client.post("/logs/", json={
+            "goal_id": goal["id"], "subgoal_id": subgoal, "log_date": today,
+            "minutes_spent": 45, "count_done": 1, "note": "вечер"
+        })
+        assert first.status_code == 201 and second.status_code == 201
+        assert first.json()["id"] == second.json()["id"], "Должна обновиться та же запись"
+        assert second.json()["minutes_spent"] == 75
+        assert second.json()["count_done"] == 1
+        assert second.json()["note"] == "утро | вечер"
+
+    logs = client.get(f"/logs/?goal_id={goal['id']}").json()
+    assert len(logs) == 2, "Одна запись без подзадачи и одна с подзадачей"
+    print("  Тест пройден\n")
+
+
+def test_log_unknown_goal_or_subgoal():
+    """Лог для чужой подзадачи или несуществующей цели — 404."""
+    print("Тест 2: Валидация цели и подзадачи")
+
+    client, _ = make_test_client()
+    user, goal = _create_user_and_goal(client)
+    _, other_goal = _create_user_and_goal(client, plan=[{"title": "Чужая", "target": 5.0}])
+    client.token = user["token"]
+    today = date.today().isoformat()
+
+    response = client.post("/logs/", json={"goal_id": "missing", "log_date": today})
+    assert response.status_code == 404
+
+    response = client.post("/logs/", json={
+        "goal_id": goal["id"], "subgoal_id": other_goal["plan"][0]["id"], "log_date": today
+    })
+    assert response.status_code == 404
+    print("  Тест пройден\n")
+
+
+def test_logs_batch():
+    """Пакетная загрузка: дубли сливаются, ошибки возвращаются по индексам."""
+    print("Тест 3: POST /logs/batch")
+
+    client, _ = make_test_client()
+    user, goal = _create_user_and_goal(client, plan=[{"title": "Подзадача", "target": 20.0}])
+    _, foreign_goal = _create_user_and_goal(client)
+    client.token = user["token"]
+    subgoal_id = goal["plan"][0]["id"]
+    today = date.today()
+
+    client.post("/logs/", json={"goal_id": goal["id"], "log_date": today.isoformat(), "minutes_spent": 10})
+
+    items = [
+        {"goal_id": goal["id"], "log_date": today.isoformat(), "minutes_spent": 20, "note": "а"},
+        {"goal_id": goal["id"], "log_date": today.isoformat(), "minutes_spent": 30, "note": "б"},
+        {"goal_id": goal["id"], "subgoal_id": subgoal_id, "log_date": today.isoformat(), "count_done": 2},
+        {"goal_id": goal["id"], "log_date": (today - timedelta(days=1)).isoformat(), "minutes_spent": 15},
+        {"goal_id": foreign_goal["id"], "log_date": today.isoformat(), "minutes_spent": 5},
+        {"goal_id": goal["id"], "subgoal_id": "missing", "log_date": today.isoformat()},
+    ]
+    response = client.post("/logs/batch", json={"items": items})
+    assert response.status_code == 200
+    data = response.json()
+
+    print(f"  Записано: {data['written']}, ошибок: {len(data['errors'])}")
+
+    assert data["written"] == 3, "Два дубля сливаются в одну запись"
+    assert data["ids"][0] == data["ids"][1]
+    assert data["ids"][4] is None and data["ids"][5] is None
+    assert [e["index"] for e in data["errors"]] == [4, 5], "Чужая цель и неизвестная подзадача"
+
+    logs = {log["id"]: log for log in client.get(f"/logs/?goal_id={goal['id']}").json()}
+    merged = logs[data["ids"][0]]
+    assert merged["minutes_spent"] == 60, "10 из одиночного лога + 20 + 30 из пакета"
+    assert merged["note"] == "а | б"
+    print("  Тест пройден\n")
+
+
+def test_logs_pagination_and_stream():
+    """Постраничный вывод по курсору и NDJSON-поток отдают все логи без повторов."""
+    print("Тест 4: Пагинация и поток GET /logs")
+
+    client, _ = make_test_client()
+    _, goal = _create_user_and_goal(client, plan=[{"title": "Подзадача", "target": 20.0}])
+    today = date.today()
+    items = [
+        {"goal_id": goal["id"], "subgoal_id": goal["plan"][0]["id"] if i % 2 else None,
+         "log_date": (today - timedelta(days=i // 2)).isoformat(), "minutes_spent": 10}
+        for i in range(25)
+    ]
+    client.post("/logs/batch", json={"items": items})
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"goal_id": goal["id"], "limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/logs/", params=params)
+        page = response.json()
+        seen.extend(log["id"] for log in page)
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    print(f"  Прочитано по страницам: {len(seen)}")
+    assert len(seen) == 25 and len(set(seen)) == 25
+
+    response = client.get("/logs/", params={"goal_id": goal["id"], "stream": True})
+    lines = response.text.strip().split("\n")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert len(lines) == 25
+
+    assert client.get("/logs/?cursor=@@").status_code == 400
+    print("  Тест пройден\n")
+
+
+def test_progress_totals_stay_consistent():
+    """Счётчики целей и подзадач после записей совпадают с пересчётом из логов."""
+    print("Тест 5: Счётчики прогресса")
+
+    client, TestingSession = make_test_client()
+    _, goal = _create_user_and_goal(client, plan=[
+        {"title": "Первая", "target": 10.0},
+        {"title": "Вторая", "target": 10.0}
+    ])
+    first_id, second_id = goal["plan"][0]["id"], goal["plan"][1]["id"]
+    today = date.today()
+
+    client.post("/logs/", json={"goal_id": goal["id"], "subgoal_id": first_id,
+                                "log_date": today.isoformat(), "minutes_spent": 60})
+    log = client.post("/logs/", json={"goal_id": goal["id"], "subgoal_id": second_id,
+                                      "log_date": today.isoformat(), "minutes_spent": 90}).json()
+    extra = client.post("/logs/", json={"goal_id": goal["id"],
+                                        "log_date": today.isoformat(), "minutes_spent": 15}).json()
+    client.post("/logs/batch", json={"items": [
+        {"goal_id": goal["id"], "subgoal_id": first_id,
+         "log_date": (today - timedelta(days=1)).isoformat(), "minutes_spent": 30}
+    ]})
+    client.put(f"/logs/{log['id']}", json={"minutes_spent": 120})
+    client.delete(f"/logs/{extra['id']}")
+
+    response = client.get(f"/goals/{goal['id']}").json()
+    assert response["plan"][0]["current"] == 1.5
+    assert response["plan"][1]["current"] == 2.0
+
+    # Удаляем вторую подзадачу вместе с её логами
+    client.put(f"/goals/{goal['id']}", json={"plan": [{"id": first_id, "title": "Первая", "target": 10.0}]})
+
+    db = TestingSession()
+    try:
+        stored = db.query(Goal.total_minutes, Goal.total_count).filter(Goal.id == goal["id"]).one()
+        stored_sub = db.query(Subgoal.total_minutes).filter(Subgoal.id == first_id).scalar()
+        rebuild_progress_totals(db, [goal["id"]])
+        rebuilt = db.query(Goal.total_minutes, Goal.total_count).filter(Goal.id == goal["id"]).one()
+        rebuilt_sub = db.query(Subgoal.total_minutes).filter(Subgoal.id == first_id).scalar()
+    finally:
+        db.close()
+
+    print(f"  Счётчик цели: {tuple(stored)}, пересчёт: {tuple(rebuilt)}")
+    assert tuple(stored) == tuple(rebuilt) == (90, 0)
+    assert stored_sub == rebuilt_sub == 90
+    print("  Тест пройден\n")
+
+
+def test_daily_rollup_matches_logs():
+    """Подневная сводка после записей и удалений совпадает с пересчётом из логов."""
+    print("Тест 6: Подневная сводка daily_rollup")
+
+    client, TestingSession = make_test_client()
+    user, goal = _create_user_and_goal(client, plan=[{"title": "Подзадача", "target": 20.0}])
+    _, other_goal = _create_user_and_goal(client)
+    client.token = user["token"]
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+
+    client.post("/logs/", json={"goal_id": goal["id"], "subgoal_id": goal["plan"][0]["id"],
+                                "log_date": today.isoformat(), "minutes_spent": 30})
+    client.post("/logs/", json={"goal_id": goal["id"], "log_date": today.isoformat(), "count_done": 2})
+    single = client.post("/logs/", json={"goal_id": goal["id"], "log_date": yesterday.isoformat(),
+                                         "minutes_spent": 45}).json()
+    client.put(f"/logs/{single['id']}", json={"minutes_spent": 60})
+    client.post("/logs/batch", json={"items": [
+        {"goal_id": goal["id"], "log_date": (today - timedelta(days=2)).isoformat(), "minutes_spent": 10}
+    ]})
+    client.delete(f"/logs/{single['id']}")
+
+    month = client.get(f"/reports/month/{today.year}/{today.month}").json()
+    by_day = {day["date"]: day for day in month["days"]}
+    assert by_day[today.isoformat()]["total_hours"] == 0.5
+    assert by_day[today.isoformat()]["total_count"] == 2
+    assert by_day[today.isoformat()]["goals_active"] == 1
+    assert yesterday.isoformat() not in by_day, "После удаления единственного лога день пропадает"
+
+    def snapshot(db):
+        rows = db.query(DailyRollup).order_by(DailyRollup.user_id, DailyRollup.day).all()
+        return [(r.user_id, r.day, r.minutes, r.count, r.goals_active) for r in rows]
+
+    db = TestingSession()
+    try:
+        stored = snapshot(db)
+        rebuild_daily_rollup(db)
+        rebuilt = snapshot(db)
+    finally:
+        db.close()
+
+    print(f"  Строк в сводке: {len(stored)}")
+    assert stored == rebuilt
+    print("  Тест пройден\n")
+
+
+def test_concurrent_rollup_writes():
+    """Две транзакции пишут логи в один день по разным целям: сводка учитывает оба лога."""
+    print("Тест 7: Параллельные записи в daily_rollup")
+
+    client, TestingSession = make_test_client()
+    user, goal = _create_user_and_goal(client)
+    other_goal = client.post("/goals/", json={**{k: goal[k] for k in (
+        "type", "target", "unit", "period_start", "period_end")}, "title": "Вторая цель"}).json()
+    today = date.today()
+
+    def write_log(db, goal_id, minutes):
+        db.add(Log(goal_id=goal_id, log_date=today, minutes_spent=minutes, count_done=0))
+        db.flush()
+        refresh_daily_rollup(db, user["id"], [today])
+
+    first, second = TestingSession(), TestingSession()
+    errors = []
+
+    def second_writer():
+        try:
+            write_log(second, other_goal["id"], 45)
+            second.commit()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            second.close()
+
+    try:
+        write_log(first, goal["id"], 30)
+        worker = threading.Thread(target=second_writer)
+        worker.start()
+        time.sleep(0.2)
+        assert worker.is_alive(), "Вторая транзакция должна ждать первую"
+        first.commit()
+        worker.join()
+    finally:
+        first.close()
+    assert not errors, errors
+
+    db = TestingSession()
+    try:
+        row = db.get(DailyRollup, (user["id"], today))
+        print(f"  Сводка за день: {row.minutes} мин, целей {row.goals_active}")
+        assert (row.minutes, row.goals_active) == (75, 2)
+    finally:
+        db.close()
+
+    # На PostgreSQL очередь обеспечивает блокировка строки пользователя
+    lock_sql = str(_rollup_lock_stmt(user["id"]).compile(dialect=postgresql.dialect()))
+    assert lock_sql.endswith("FOR NO KEY UPDATE"), lock_sql
+    print("  Тест пройден\n")
+
+
+def run_all_tests():
+    print("=" * 50)
+    print("Тесты логов")
+    print("=" * 50 + "\n")
+
+    test_log_upsert_merges_same_day()
+    test_log_unknown_goal_or_subgoal()
+    test_logs_batch()
+    test_logs_pagination_and_stream()
+    test_progress_totals_stay_consistent()
+    test_daily_rollup_matches_logs()
+    test_concurrent_rollup_writes()
+
+    print("=" * 50)
+    print("Все тесты логов пройдены успешно")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Тесты метрик: текстовый формат, эндпоинт /metrics, задержка Ollama.
+Накладные расходы middleware замеряет benchmarks/bench_middleware.py.
+"""
+from metrics import Counter, Gauge, Histogram, Registry
+from routers import ai
+from routers.ai import ollama_request_duration
+from tests.helpers import make_test_client
+
+
+def _parse(text: str) -> dict:
+    """Строки выборок /metrics -> {"имя{метки}": значение}."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_text_format():
+    """Счётчик, gauge и гистограмма выводятся в формате Prometheus."""
+    print("Тест 1: Текстовый формат")
+
+    registry = Registry()
+    requests = Counter("test_requests_total", "Запросы", ["route"], registry=registry)
+    in_progress = Gauge("test_in_progress", "В работе", registry=registry)
+    latency = Histogram("test_latency_seconds", "Задержка", buckets=(0.1, 1.0), registry=registry)
+
+    requests.inc(route='/a"b')
+    requests.inc(2, route='/a"b')
+    in_progress.inc()
+    in_progress.inc()
+    in_progress.dec()
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    text = registry.render()
+    print(text)
+    assert "# TYPE test_requests_total counter" in text
+    samples = _parse(text)
+    assert samples['test_requests_total{route="/a\\"b"}'] == 3
+    assert samples["test_in_progress"] == 1
+    assert samples['test_latency_seconds_bucket{le="0.1"}'] == 1
+    assert samples['test_latency_seconds_bucket{le="1"}'] == 2
+    assert samples['test_latency_seconds_bucket{le="+Inf"}'] == 3
+    assert samples["test_latency_seconds_count"] == 3
+    assert abs(samples["test_latency_seconds_sum"] - 5.55) < 1e-9
+
+    try:
+        requests.inc(-1, route="/a")
+        raise AssertionError("Счётчик не должен уменьшаться")
+    except ValueError:
+        pass
+    print("  Тест пройден\n")
+
+
+def test_metrics_endpoint():
+    """/metrics отдаёт запросы по шаблону маршрута, время в БД и попадания в кэш отчётов."""
+    print("Тест 2: Эндпоинт /metrics")
+
+    client, _ = make_test_client()
+    client.login()
+    before = _parse(client.get("/metrics").text)
+
+    client.get("/goals/")
+    client.get("/goals/unknown-id")
+    client.get("/reports/summary")
+    client.get("/reports/summary")
+    client.get("/no-such-route")
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    after = _parse(response.text)
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    assert delta('goalpace_http_requests_total{method="GET",route="/goals/",status="200"}') == 1
+    assert delta('goalpace_http_requests_total{method="GET",route="/goals/{goal_id}",status="404"}') == 1
+    assert delta('goalpace_http_requests_total{method="GET",route="unmatched",status="404"}') == 1
+    assert delta('goalpace_http_request_duration_seconds_count{method="GET",route="/reports/summary"}') == 2
+    assert delta('goalpace_db_queries_total{route="/goals/"}') == 1
+    assert delta('goalpace_db_duration_seconds_total{route="/goals/"}') > 0
+    assert delta("goalpace_report_cache_hits_total") == 1
+    assert after['goalpace_http_requests_in_progress{method="GET"}'] == 1, "Считается только сам /metrics"
+    print("  Тест пройден\n")
+
+
+def test_ollama_latency_recorded():
+    """Неудачный вызов Ollama попадает в гистограмму с outcome="error"."""
+    print("Тест 3: Задержка Ollama")
+
+    client, _ = make_test_client()
+    errors_before = ollama_request_duration.count(outcome="error")
+    ollama_url = ai.settings.ollama_url
+    ai.settings.ollama_url = "http://127.0.0.1:9"
+    try:
+        response = client.post("/ai/generate-plan", json={"prompt": "Выучить английский"})
+    finally:
+        ai.settings.ollama_url = ollama_url
+
+    assert response.status_code == 500
+    assert ollama_request_duration.count(outcome="error") == errors_before + 1
+    print("  Тест пройден\n")
+
+
+if __name__ == "__main__":
+    test_text_format()
+    test_metrics_endpoint()
+    test_ollama_latency_recorded()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Тесты профилировщика запросов: сэмплер стеков и middleware по секрету.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from main import app
+from profiling import ProfilingMiddleware, StackSampler
+from tests.helpers import ApiClient, make_test_client
+
+
+def _busy_loop(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def test_sampler_collects_stacks():
+    """Стек занятого потока попадает в профиль, корень стека — имя потока."""
+    print("Тест 1: Сэмплер стеков")
+
+    worker = threading.Thread(target=_busy_loop, args=(0.2,), name="busy-worker")
+    sampler = StackSampler(0.001)
+    sampler.start()
+    worker.start()
+    worker.join()
+    sampler.stop()
+
+    collapsed = sampler.collapsed()
+    busy = [line for line in collapsed.splitlines() if line.startswith("busy-worker;")]
+    print(f"  Сэмплов: {sampler.samples}, стеков busy-worker: {len(busy)}")
+    assert busy, "Стеки занятого потока должны попасть в профиль"
+    assert all("_busy_loop (test_profiling.py:" in line for line in busy)
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) > 0
+    print("  Тест пройден\n")
+
+
+def test_profile_on_token_only():
+    """Профиль пишется только для запросов с верным секретом в X-Profile."""
+    print("Тест 2: Профилирование по секрету")
+
+    make_test_client()
+    profiles_dir = tempfile.mkdtemp(prefix="goalpace-profiles-")
+    client = ApiClient(ProfilingMiddleware(app, profiles_dir=profiles_dir, token="s3cret"))
+    try:
+        client.login()
+
+        for headers in ({}, {"X-Profile": "1"}, {"X-Profile": "wrong"}):
+            response = client.get("/goals/?profile=1", headers=headers)
+            assert response.status_code == 200
+            assert "X-Profile-File" not in response.headers, headers
+        assert os.listdir(profiles_dir) == []
+
+        goals = client.get("/goals/", headers={"X-Profile": "s3cret"})
+        summary = client.get("/reports/summary", headers={"X-Profile": "s3cret"})
+        assert goals.status_code == 200 and summary.status_code == 200
+
+        names = [goals.headers["X-Profile-File"], summary.headers["X-Profile-File"]]
+        print(f"  Профили: {names}")
+        assert "-GET-goals-" in names[0] and "-GET-reports_summary-" in names[1]
+        assert sorted(os.listdir(profiles_dir)) == sorted(names)
+    finally:
+        shutil.rmtree(profiles_dir)
+    print("  Тест пройден\n")
+
+
+def test_profiles_capped():
+    """В каталоге остаются только max_files последних профилей; без токена профилирование выключено."""
+    print("Тест 3: Ограничение числа профилей")
+
+    make_test_client()
+    profiles_dir = tempfile.mkdtemp(prefix="goalpace-profiles-")
+    client = ApiClient(ProfilingMiddleware(app, profiles_dir=profiles_dir, token="s3cret", max_files=2))
+    try:
+        names = [client.get("/health", headers={"X-Profile": "s3cret"}).headers["X-Profile-File"] for _ in range(4)]
+        assert sorted(os.listdir(profiles_dir)) == sorted(names[-2:])
+
+        no_token = ApiClient(ProfilingMiddleware(app, profiles_dir=profiles_dir, token=""))
+        assert "X-Profile-File" not in no_token.get("/health", headers={"X-Profile": ""}).headers
+    finally:
+        shutil.rmtree(profiles_dir)
+    print("  Тест пройден\n")
+
+
+def test_disabled_by_default():
+    """Без PROFILING_ENABLED middleware не зарегистрирован и флаг игнорируется."""
+    print("Тест 4: Профилировщик выключен по умолчанию")
+
+    client, _ = make_test_client()
+    assert ProfilingMiddleware not in [m.cls for m in app.user_middleware]
+    assert "X-Profile-File" not in client.get("/health", headers={"X-Profile": "s3cret"}).headers
+    print("  Тест пройден\n")
+
+
+if __name__ == "__main__":
+    test_sampler_collects_stacks()
+    test_profile_on_token_only()
+    test_profiles_capped()
+    test_disabled_by_default()
@@ -2,11 +2,14 @@
 """
 Тесты расчётов прогресса: красная линия, статус, дневная серия.
 """
-from datetime import date
+import random
+from datetime import date, timedelta
 from models.models import Goal, Log, Subgoal, GoalType, GoalUnit
 from progress import (
     calculate_progress_metrics,
     calculate_actual_progress,
+    calculate_progress_metrics_batch,
+    calculate_progress_metrics_from_totals,
     determine_status,
     get_daily_progress_series
 )
@@ -203,6 +206,36 @@ def test_overdue_goal():
     print("  Тест пройден\n")
 
 
+def test_batch_matches_single():
+    """Тест пакетного расчёта: на случайных целях совпадает с расчётом по одной цели до последнего знака."""
+    print("Тест 7: Пакетный расчёт")
+
+    rng = random.Random(20261018)
+    today = date(2026, 4, 15)
+    goals, minutes, counts = [], [], []
+    for i in range(20000):
+        goal_type = rng.choice([GoalType.TIME, GoalType.COUNT])
+        start = today + timedelta(days=rng.randint(-120, 30))
+        goals.append(Goal(
+            id=f"batch-{i}", user_id="user-1", title="Пакет",
+            type=goal_type, target=round(rng.uniform(0.5, 500), rng.choice([0, 1, 2])),
+            unit=GoalUnit.HOURS if goal_type == GoalType.TIME else GoalUnit.COUNT,
+            period_start=start, period_end=start + timedelta(days=rng.randint(0, 180))
+        ))
+        minutes.append(rng.randint(0, 30000) if goal_type == GoalType.TIME else 0)
+        counts.append(rng.randint(0, 600) if goal_type == GoalType.COUNT else 0)
+
+    batch = calculate_progress_metrics_batch(goals, minutes, counts, current_date=today)
+
+    for i, goal in enumerate(goals):
+        single = calculate_progress_metrics_from_totals(goal, minutes[i], counts[i], current_date=today)
+        for key, value in single.items():
+            assert batch[key][i] == value, f"{goal.id}: {key} {batch[key][i]} != {value}"
+
+    print(f"  Целей в пакете: {len(goals)}, статусы: {sorted(set(batch['status']))}")
+    print("  Тест пройден\n")
+
+
 def run_all_tests():
     print("=" * 50)
     print("Тесты расчёта прогресса")
@@ -215,6 +248,7 @@ def run_all_tests():
         test_completed_goal()
         test_daily_series()
         test_overdue_goal()
+        test_batch_matches_single()
 
         print("=" * 50)
         print("Все тесты прогресса пройдены успешно")
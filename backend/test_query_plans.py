@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Проверка планов запросов (EXPLAIN QUERY PLAN, SQLite):
+все запросы роутеров должны идти по индексам, без полного сканирования таблиц.
+"""
+import re
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from database import Base
+from tests.helpers import make_test_client
+
+# "SCAN logs" — полный проход по таблице; "SCAN logs USING INDEX ..." допустим,
+# как и проход по подзапросу (SCAN anon_1)
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def _capture_statements(engine):
+    """Собирает все SQL-запросы (кроме INSERT ... VALUES), которые уходят в БД."""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT") and " SELECT " not in statement.upper():
+            return
+        if executemany:
+            parameters = parameters[0]
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return captured, before_cursor_execute
+
+
+def _exercise_routes(client):
+    """Прогоняет типичные сценарии фронтенда: дашборд, логи, аналитика."""
+    client.login("plans@example.com")
+    client.login("plans@example.com")
+    today = date.today()
+
+    goal = client.post("/goals/", json={
+        "title": "Цель", "type": "time", "target": 10.0, "unit": "hours",
+        "period_start": (today - timedelta(days=10)).isoformat(),
+        "period_end": (today + timedelta(days=10)).isoformat(),
+        "plan": [{"title": "Первая", "target": 5.0}, {"title": "Вторая", "target": 5.0}]
+    }).json()
+    first_id = goal["plan"][0]["id"]
+
+    log = client.post("/logs/", json={"goal_id": goal["id"], "subgoal_id": first_id,
+                                      "log_date": today.isoformat(), "minutes_spent": 30}).json()
+    client.post("/logs/", json={"goal_id": goal["id"], "log_date": today.isoformat(), "count_done": 1})
+    client.post("/logs/batch", json={"items": [
+        {"goal_id": goal["id"], "subgoal_id": first_id,
+         "log_date": (today - timedelta(days=1)).isoformat(), "minutes_spent": 20}
+    ]})
+    client.put(f"/logs/{log['id']}", json={"minutes_spent": 40})
+
+    client.get("/goals/")
+    client.get("/goals/?active_only=true")
+    client.get(f"/goals/{goal['id']}")
+    client.get(f"/logs/?goal_id={goal['id']}")
+    page = client.get("/logs/?limit=1")
+    client.get(f"/logs/?limit=1&cursor={page.headers['x-next-cursor']}")
+    client.get(f"/logs/{log['id']}")
+    client.get("/reports/summary")
+    client.get(f"/reports/goal/{goal['id']}")
+    client.get(f"/reports/month/{today.year}/{today.month}")
+
+    client.put(f"/goals/{goal['id']}", json={"plan": [{"id": first_id, "title": "Первая", "target": 5.0}]})
+    client.delete(f"/logs/{log['id']}")
+    client.delete(f"/goals/{goal['id']}")
+
+
+def test_router_queries_use_indexes():
+    """Ни один запрос роутеров не делает полный SCAN таблицы."""
+    print("Тест: планы запросов роутеров")
+
+    client, TestingSession = make_test_client()
+    engine = TestingSession.kw["bind"]
+    statements, listener = _capture_statements(engine)
+
+    _exercise_routes(client)
+    event.remove(engine, "before_cursor_execute", listener)
+    assert statements
+
+    full_scans = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            for row in plan:
+                detail = row[-1]
+                match = FULL_SCAN.match(detail)
+                if match and match.group(1) in Base.metadata.tables:
+                    full_scans.append(f"{detail}: {statement}")
+
+    print(f"  Проверено запросов: {len(statements)}")
+    for scan in full_scans:
+        print(f"  {scan}")
+
+    assert not full_scans, "Есть запросы с полным сканированием таблицы"
+    print("  Тест пройден\n")
+
+
+if __name__ == "__main__":
+    test_router_queries_use_indexes()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Тесты отчётов на временной базе: кэш сводки, его инвалидация, ETag
+и проверка пользователя без обращения к БД.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from cache import report_cache
+from tests.helpers import make_test_client
+
+
+def _create_user_and_goal(client):
+    user = client.login()
+    today = date.today()
+    goal = client.post("/goals/", json={
+        "title": "Отчётная цель", "type": "count", "target": 10.0, "unit": "count",
+        "period_start": (today - timedelta(days=5)).isoformat(),
+        "period_end": (today + timedelta(days=5)).isoformat()
+    }).json()
+    return user, goal
+
+
+def test_summary_cache_hit_and_invalidation():
+    """Повторный запрос сводки берётся из кэша, запись лога его сбрасывает."""
+    print("Тест 1: Кэш отчётов")
+
+    client, _ = make_test_client()
+    _, goal = _create_user_and_goal(client)
+    today = date.today()
+    summary_url = "/reports/summary"
+    month_url = f"/reports/month/{today.year}/{today.month}"
+
+    first = client.get(summary_url).json()
+    client.get(month_url)
+    hits_before = report_cache.hits
+    second = client.get(summary_url).json()
+    client.get(month_url)
+
+    print(f"  Попаданий в кэш: {report_cache.hits - hits_before}")
+    assert report_cache.hits - hits_before == 2
+    assert first == second
+
+    client.post("/logs/", json={"goal_id": goal["id"], "log_date": today.isoformat(), "count_done": 10})
+    after_write = client.get(summary_url).json()
+    month = client.get(month_url).json()
+
+    assert after_write["total_percent"] == 100.0, "После записи лога сводка пересчитана"
+    assert month["days"][-1]["total_count"] == 10
+    print("  Тест пройден\n")
+
+
+def test_etag_not_modified():
+    """Совпавший If-None-Match даёт 304, запись лога меняет ETag."""
+    print("Тест 2: ETag / If-None-Match")
+
+    client, _ = make_test_client()
+    _, goal = _create_user_and_goal(client)
+    urls = ["/goals/", f"/goals/{goal['id']}", "/reports/summary", f"/reports/goal/{goal['id']}"]
+
+    etags = {}
+    for url in urls:
+        response = client.get(url)
+        etags[url] = response.headers["etag"]
+        repeat = client.get(url, headers={"If-None-Match": etags[url]})
+        assert repeat.status_code == 304, url
+        assert repeat.headers["etag"] == etags[url]
+        assert repeat.content == b""
+
+    client.post("/logs/", json={"goal_id": goal["id"], "log_date": date.today().isoformat(), "count_done": 1})
+
+    for url in urls:
+        response = client.get(url, headers={"If-None-Match": etags[url]})
+        assert response.status_code == 200, f"После записи лога {url} отдаётся заново"
+        assert response.headers["etag"] != etags[url]
+    print("  Тест пройден\n")
+
+
+def test_reports_skip_user_lookup():
+    """Отчёты проверяют пользователя по токену и не обращаются к таблице users."""
+    print("Тест 3: Отчёты без запросов к users")
+
+    client, TestingSession = make_test_client()
+    engine = TestingSession.kw["bind"]
+    _, goal = _create_user_and_goal(client)
+    today = date.today()
+
+    user_queries = []
+
+    def count_user_selects(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT") and "FROM users" in statement:
+            user_queries.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_user_selects)
+    try:
+        client.get("/reports/summary")
+        client.get(f"/reports/goal/{goal['id']}")
+        client.get(f"/reports/month/{today.year}/{today.month}")
+    finally:
+        event.remove(engine, "before_cursor_execute", count_user_selects)
+
+    print(f"  Запросов к users: {len(user_queries)}")
+    assert not user_queries
+    print("  Тест пройден\n")
+
+
+def run_all_tests():
+    print("=" * 50)
+    print("Тесты отчётов")
+    print("=" * 50 + "\n")
+
+    test_summary_cache_hit_and_invalidation()
+    test_etag_not_modified()
+    test_reports_skip_user_lookup()
+
+    print("=" * 50)
+    print("Все тесты отчётов пройдены успешно")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    run_all_tests()
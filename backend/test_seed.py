@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Тесты генератора синтетических данных seed.generate_dataset.
+"""
+from datetime import date
+
+from sqlalchemy import select
+
+from aggregates import rebuild_daily_rollup, rebuild_progress_totals
+from models import DailyRollup, Goal, Log, Subgoal
+from seed import generate_dataset
+from tests.helpers import make_test_client
+
+END_DATE = date(2026, 1, 31)
+
+
+def _snapshot(session_factory) -> dict:
+    db = session_factory()
+    try:
+        return {
+            "goals": db.execute(select(Goal.id, Goal.period_start, Goal.total_minutes, Goal.total_count).order_by(Goal.id)).all(),
+            "subgoals": db.execute(select(Subgoal.id, Subgoal.total_minutes, Subgoal.total_count).order_by(Subgoal.id)).all(),
+            "logs": db.execute(select(Log.id, Log.log_date, Log.minutes_spent, Log.count_done).order_by(Log.id)).all(),
+            "rollup": db.execute(select(DailyRollup.user_id, DailyRollup.day, DailyRollup.minutes,
+                                        DailyRollup.count, DailyRollup.goals_active)
+                                 .order_by(DailyRollup.user_id, DailyRollup.day)).all(),
+        }
+    finally:
+        db.close()
+
+
+def test_generate_is_deterministic():
+    """Один seed — одинаковые данные; порции не влияют на результат."""
+    print("Тест 1: Детерминированность")
+
+    _, first = make_test_client()
+    _, second = make_test_client()
+    params = dict(users=4, goals_per_user=3, subgoals_per_goal=2, days=60, density=0.5, seed=7, end_date=END_DATE)
+    written = generate_dataset(first.kw["bind"], chunk_size=100000, **params)
+    generate_dataset(second.kw["bind"], chunk_size=50, **params)
+
+    assert written["users"] == 4 and written["goals"] == 12 and written["subgoals"] == 24
+    assert written["logs"] > 0
+    assert _snapshot(first) == _snapshot(second)
+    print("  Тест пройден\n")
+
+
+def test_generated_totals_match_logs():
+    """Счётчики и daily_rollup совпадают с пересчётом из логов, в том числе без подзадач."""
+    print("Тест 2: Счётчики совпадают с логами")
+
+    _, session_factory = make_test_client()
+    engine = session_factory.kw["bind"]
+    generate_dataset(engine, users=3, goals_per_user=2, subgoals_per_goal=3, days=45, density=0.7, seed=1, end_date=END_DATE)
+    written = generate_dataset(engine, users=2, goals_per_user=2, subgoals_per_goal=0, days=45, density=0.7, seed=2, end_date=END_DATE)
+    assert written["subgoals"] == 0
+
+    generated = _snapshot(session_factory)
+    db = session_factory()
+    rebuild_progress_totals(db)
+    rebuild_daily_rollup(db)
+    db.commit()
+    db.close()
+    assert _snapshot(session_factory) == generated
+
+    try:
+        generate_dataset(engine, users=1, seed=1, end_date=END_DATE)
+        raise AssertionError("Повторный seed должен отклоняться")
+    except ValueError:
+        pass
+    print("  Тест пройден\n")
+
+
+if __name__ == "__main__":
+    test_generate_is_deterministic()
+    test_generated_totals_match_logs()
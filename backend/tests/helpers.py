@@ -0,0 +1,197 @@
+"""
+Вспомогательные функции для тестов API без запущенного сервера
+"""
+import asyncio
+import atexit
+import os
+import tempfile
+
+import httpx
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database import (
+    Base, SyncSessionAdapter, _async_url, _listen_sqlite_pragmas, _session_scope, get_db, get_read_db,
+    reads_from_primary, set_sqlite_pragmas, set_sqlite_read_pragmas
+)
+from main import app
+
+
+class ApiClient:
+    """
+    Синхронный клиент, который вызывает приложение напрямую через ASGI.
+    Если задан token, он уходит в заголовке Authorization каждого запроса.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.token = None
+        self._cleanups = []
+
+    def close(self) -> None:
+        """Освобождает ресурсы клиента (соединения, временные файлы, подмены зависимостей)."""
+        while self._cleanups:
+            self._cleanups.pop()()
+
+    def login(self, email=None) -> dict:
+        """Входит как демо-пользователь и запоминает его токен."""
+        user = self.post("/auth/demo", json={"email": email}).json()
+        self.token = user["token"]
+        return user
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if self.token:
+            kwargs["headers"] = {"Authorization": f"Bearer {self.token}", **kwargs.get("headers", {})}
+
+        async def send():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+                return await client.request(method, url, **kwargs)
+
+        return asyncio.run(send())
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("DELETE", url, **kwargs)
+
+
+def assert_max_queries(response: httpx.Response, max_queries: int) -> int:
+    """Проверяет бюджет SQL-запросов маршрута по заголовку X-Query-Count."""
+    count = int(response.headers["X-Query-Count"])
+    request = response.request
+    assert count <= max_queries, (
+        f"{request.method} {request.url.path}: {count} SQL-запросов, бюджет {max_queries}"
+    )
+    return count
+
+
+def _session_override(session_factory):
+    async def override():
+        db = SyncSessionAdapter(session_factory())
+        try:
+            yield db
+        finally:
+            await db.close()
+
+    return override
+
+
+def _read_session_override(session_factory, read_session_factory):
+    """Как get_read_db: реплика, но сразу после записи пользователя — основная база."""
+    async def override(request: Request):
+        factory = session_factory if reads_from_primary(request) else read_session_factory
+        db = SyncSessionAdapter(factory())
+        try:
+            yield db
+        finally:
+            await db.close()
+
+    return override
+
+
+def _async_session_override(session_factory):
+    """Сессия как в get_db при DATABASE_ASYNC=true."""
+    async def override():
+        async with _session_scope(session_factory, None) as db:
+            yield db
+
+    return override
+
+
+_open_clients = []
+
+
+def close_test_clients() -> None:
+    """Закрывает все клиенты make_test_client (в обратном порядке создания)."""
+    while _open_clients:
+        _open_clients.pop().close()
+
+
+# Для запуска тестов скриптом; под pytest клиенты закрывает conftest.py после каждого теста
+atexit.register(close_test_clients)
+
+
+def _remove_database(path: str) -> None:
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _override_dependencies(overrides: dict):
+    """Подменяет зависимости приложения и возвращает функцию, возвращающую прежние."""
+    previous = {dependency: app.dependency_overrides.get(dependency) for dependency in overrides}
+    app.dependency_overrides.update(overrides)
+
+    def restore():
+        for dependency, override in previous.items():
+            if override is None:
+                app.dependency_overrides.pop(dependency, None)
+            else:
+                app.dependency_overrides[dependency] = override
+
+    return restore
+
+
+def make_test_client(read_replica: bool = False, async_db: bool = False):
+    """
+    Поднимает приложение на временной SQLite-базе.
+    Возвращает (клиент, фабрика сессий этой базы).
+    С read_replica=True чтения идут через отдельное соединение mode=ro
+    к тому же файлу; его фабрика доступна как client.read_session.
+    С async_db=True роутеры получают AsyncSession на aiosqlite, как при
+    DATABASE_ASYNC=true; возвращаемая фабрика остаётся синхронной.
+    client.close() закрывает соединения, удаляет файл базы и снимает
+    подмену зависимостей; незакрытые клиенты закрывает close_test_clients().
+    """
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="goalpace-test-")
+    os.close(fd)
+    client = ApiClient(app)
+    _open_clients.append(client)
+    client._cleanups.append(lambda: _remove_database(path))
+
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    client._cleanups.append(engine.dispose)
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    Base.metadata.create_all(engine)
+    TestingSession = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+    ReadSession = TestingSession
+    if read_replica:
+        read_engine = create_engine(
+            f"sqlite:///file:{path}?mode=ro&uri=true", connect_args={"check_same_thread": False}
+        )
+        event.listen(read_engine, "connect", set_sqlite_read_pragmas)
+        client._cleanups.append(read_engine.dispose)
+        ReadSession = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
+
+    if async_db:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from sqlalchemy.pool import NullPool
+
+        # Каждый запрос ApiClient выполняется в своём цикле событий (asyncio.run),
+        # а соединение aiosqlite живёт в цикле, где открыто, поэтому без пула
+        async_engine = create_async_engine(
+            _async_url(f"sqlite:///{path}"), poolclass=NullPool, connect_args={"check_same_thread": False}
+        )
+        _listen_sqlite_pragmas(async_engine.sync_engine, read_only=False)
+        session_override = _async_session_override(
+            async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        )
+        overrides = {get_db: session_override, get_read_db: session_override}
+    else:
+        overrides = {
+            get_db: _session_override(TestingSession),
+            get_read_db: _read_session_override(TestingSession, ReadSession),
+        }
+    client._cleanups.append(_override_dependencies(overrides))
+    client.read_session = ReadSession
+    return client, TestingSession
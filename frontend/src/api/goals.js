@@ -1,15 +1,22 @@
 export const API_URL = import.meta.env.VITE_API_URL || '/api';
 
-export async function fetchGoals(userId) {
-  const res = await fetch(`${API_URL}/goals/?user_id=${userId}`);
+// Токен сессии выдаёт /auth/demo, дальше он уходит в заголовке Authorization
+let authToken = null;
+
+function authHeaders(headers = {}) {
+  return authToken ? { ...headers, Authorization: `Bearer ${authToken}` } : headers;
+}
+
+export async function fetchGoals() {
+  const res = await fetch(`${API_URL}/goals/`, { headers: authHeaders() });
   if (!res.ok) throw new Error('Ошибка загрузки целей');
   return res.json();
 }
 
-export async function createGoal(userId, goalData) {
-  const res = await fetch(`${API_URL}/goals/?user_id=${userId}`, {
+export async function createGoal(goalData) {
+  const res = await fetch(`${API_URL}/goals/`, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
+    headers: authHeaders({ 'Content-Type': 'application/json' }),
     body: JSON.stringify(goalData)
   });
   if (!res.ok) {
@@ -31,7 +38,8 @@ export async function createGoal(userId, goalData) {
 
 export async function deleteGoal(goalId) {
   const res = await fetch(`${API_URL}/goals/${goalId}`, {
-    method: 'DELETE'
+    method: 'DELETE',
+    headers: authHeaders()
   });
   if (!res.ok) throw new Error('Ошибка удаления цели');
 }
@@ -39,7 +47,7 @@ export async function deleteGoal(goalId) {
 export async function updateGoal(goalId, goalData) {
   const res = await fetch(`${API_URL}/goals/${goalId}`, {
     method: 'PUT',
-    headers: { 'Content-Type': 'application/json' },
+    headers: authHeaders({ 'Content-Type': 'application/json' }),
     body: JSON.stringify(goalData)
   });
   if (!res.ok) throw new Error('Ошибка обновления цели');
@@ -49,7 +57,7 @@ export async function updateGoal(goalId, goalData) {
 export async function createLog(logData) {
   const res = await fetch(`${API_URL}/logs/`, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
+    headers: authHeaders({ 'Content-Type': 'application/json' }),
     body: JSON.stringify(logData)
   });
   if (!res.ok) throw new Error('Ошибка сохранения прогресса');
@@ -63,19 +71,21 @@ export async function getOrCreateUser(email) {
     body: JSON.stringify({ email, tz: 'Europe/Moscow' })
   });
   if (!res.ok) throw new Error('Ошибка авторизации');
-  return res.json();
+  const user = await res.json();
+  authToken = user.token;
+  return user;
 }
 
-export async function fetchOverallSummary(userId) {
-  const res = await fetch(`${API_URL}/reports/summary?user_id=${userId}`);
+export async function fetchOverallSummary() {
+  const res = await fetch(`${API_URL}/reports/summary`, { headers: authHeaders() });
   if (!res.ok) throw new Error('Ошибка загрузки сводки');
   return res.json();
 }
 
-export async function fetchMonthReport(userId, year, month) {
-  const res = await fetch(
-    `${API_URL}/reports/month/${year}/${month}?user_id=${userId}`
-  );
+export async function fetchMonthReport(year, month) {
+  const res = await fetch(`${API_URL}/reports/month/${year}/${month}`, {
+    headers: authHeaders()
+  });
   if (!res.ok) throw new Error('Ошибка загрузки отчёта за месяц');
   return res.json();
 }
@@ -1,7 +1,7 @@
 import { useState } from 'react';
 import { createGoal, API_URL } from '../api/goals';
 
-export default function CreateGoalModal({ userId, onClose, onSuccess }) {
+export default function CreateGoalModal({ onClose, onSuccess }) {
   const emojiOptions = ['🎯', '📚', '💻', '🏃', '🧠', '📝', '🔥', '🚀', '💡', '🏆', '✅', '📈', '💪', '🎓', '🎨', '🏋️', '⭐', '📖'];
 
   const [title, setTitle] = useState('');
@@ -126,7 +126,7 @@ export default function CreateGoalModal({ userId, onClose, onSuccess }) {
     setError('');
 
     try {
-      await createGoal(userId, {
+      await createGoal({
         title: `${emoji} ${title.trim()}`,
         type,
         target: totalTarget,
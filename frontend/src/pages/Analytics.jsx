@@ -35,12 +35,12 @@ export default function Analytics({ email }) {
     setError('');
 
     try {
-      const user = await getOrCreateUser(email);
+      await getOrCreateUser(email);
       const [year, month] = monthValue.split('-').map(Number);
 
       const [summaryData, monthData] = await Promise.all([
-        fetchOverallSummary(user.id),
-        fetchMonthReport(user.id, year, month)
+        fetchOverallSummary(),
+        fetchMonthReport(year, month)
       ]);
 
       setSummary(summaryData);
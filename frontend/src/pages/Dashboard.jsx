@@ -22,16 +22,16 @@ export default function Dashboard({ email }) {
     try {
       const userData = await getOrCreateUser(email);
       setUser(userData);
-      loadGoals(userData.id);
+      loadGoals();
     } catch (err) {
       toast.error('Не удалось инициализировать пользователя');
     }
   };
 
-  const loadGoals = async (userId) => {
+  const loadGoals = async () => {
     setLoading(true);
     try {
-      const data = await fetchGoals(userId);
+      const data = await fetchGoals();
       setGoals(data);
     } catch (err) {
       toast.error('Не удалось загрузить цели');
@@ -46,13 +46,13 @@ export default function Dashboard({ email }) {
 
   const handleLogSuccess = () => {
     if (user) {
-      loadGoals(user.id);
+      loadGoals();
     }
   };
 
   const handleCreateSuccess = () => {
     if (user) {
-      loadGoals(user.id);
+      loadGoals();
     }
   };
 
@@ -89,7 +89,7 @@ export default function Dashboard({ email }) {
               key={goal.id} 
               goal={goal} 
               onLogProgress={handleLogProgress}
-              onRefresh={() => { if(user) loadGoals(user.id); }}
+              onRefresh={() => { if(user) loadGoals(); }}
             />
           ))}
         </div>
@@ -97,7 +97,6 @@ export default function Dashboard({ email }) {
 
       {showCreateModal && user && (
         <CreateGoalModal
-          userId={user.id}
           onClose={() => setShowCreateModal(false)}
           onSuccess={handleCreateSuccess}
         />